@@ -17,9 +17,260 @@ Options:
   -h --help     Show this screen.
   --version     Show version.
 """
+import argparse
 import json
+import mmap
 import os
-from docopt import docopt
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Prefer a C-accelerated JSON library when one is installed; the stdlib is the fallback.
+# ujson is only imported when orjson is missing, keeping it off the startup path otherwise.
+ujson = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    try:
+        import ujson
+    except ImportError:
+        pass
+# ijson streams large JSON arrays item by item when installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Exceptions raised for malformed JSON by whichever parsers are in use
+JSON_DECODE_ERRORS = (ValueError, ijson.JSONError) if ijson is not None else (ValueError,)
+
+
+def json_loads(data):
+    """
+    Parses JSON from bytes using orjson, then ujson, then the stdlib json module.
+    Raises ValueError (json.JSONDecodeError for orjson/stdlib) on invalid input.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_bytes(obj):
+    """
+    Serializes obj to indented UTF-8 JSON bytes, leaving non-ASCII characters unescaped.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    if ujson is not None:
+        return ujson.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def load_json_file(file_path):
+    """
+    Loads a JSON file. With orjson the file is memory-mapped and parsed in place,
+    avoiding an intermediate copy of the whole file; empty files cannot be mapped
+    and are read normally (and then fail to parse like any other invalid JSON).
+    """
+    with open(file_path, 'rb') as f:
+        if orjson is None or os.fstat(f.fileno()).st_size == 0:
+            return json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+def iter_json_array_items(file_path):
+    """
+    Yields the items of the top-level JSON array stored in file_path.
+    With ijson the array is streamed, so only one item is held in memory at a time;
+    otherwise the whole file is parsed with load_json_file.
+    Raises TypeError if the file does not contain a JSON array.
+    """
+    if ijson is None:
+        data = load_json_file(file_path)
+        if not isinstance(data, list):
+            raise TypeError(f"{file_path} does not contain a JSON array")
+        yield from data
+        return
+
+    with open(file_path, 'rb') as f:
+        if not f.read(4096).lstrip().startswith(b'['):
+            raise TypeError(f"{file_path} does not contain a JSON array")
+        f.seek(0)
+        yield from ijson.items(f, 'item', use_float=True)
+
+
+# Matches one added line of a unified diff patch and captures it without the leading '+'
+ADDED_LINE_RE = re.compile(r'(?m)^\+(?!\+\+)(.*)$')
+
+
+def extract_added_lines(patch):
+    """
+    Returns the lines added by a unified diff patch (lines starting with '+' but not '+++'),
+    without the leading '+'. Deletion-only patches are detected with a plain substring
+    search and skip the regex scan.
+    """
+    if not patch or '+' not in patch:
+        return []
+    return ADDED_LINE_RE.findall(patch)
+
+
+# A "filename" or "patch" member (a key, since it follows '{' or ',') of the PR files API objects,
+# capturing its still JSON-escaped string value
+FILE_CHANGE_FIELD_RE = re.compile(rb'[{,]\s*"(filename|patch)"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"')
+
+
+def decode_json_string_bytes(raw_value):
+    """
+    Decodes the raw bytes between the quotes of a JSON string literal.
+    """
+    if b'\\' not in raw_value:
+        return raw_value.decode('utf-8')
+    return json_loads(b'"' + raw_value + b'"')
+
+
+def scan_file_changes(data):
+    """
+    Extracts (filename, patch) pairs from the raw bytes of a PR files API response without
+    building Python objects for all the other fields GitHub returns (sha, blob_url, raw_url, ...).
+    Relies on GitHub's member order, where "patch" follows "filename" in each object; a file
+    without a patch (e.g. binary) gets None. Returns None when nothing matches or a patch has no
+    preceding filename, so the caller can fall back to a full parse.
+    """
+    file_changes = []
+    for match in FILE_CHANGE_FIELD_RE.finditer(data):
+        key, raw_value = match.groups()
+        if key == b'filename':
+            file_changes.append([decode_json_string_bytes(raw_value), None])
+        elif not file_changes or file_changes[-1][1] is not None:
+            return None
+        else:
+            file_changes[-1][1] = decode_json_string_bytes(raw_value)
+    return file_changes or None
+
+
+def load_file_changes(file_path):
+    """
+    Returns the (filename, patch) pairs of a PR detail file, scanning the memory-mapped raw
+    bytes with scan_file_changes and falling back to a full JSON parse when the scan does not apply.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                file_changes = scan_file_changes(mm)
+            if file_changes is not None:
+                return file_changes
+    return [(item.get('filename'), item.get('patch')) for item in load_json_file(file_path)]
+
+
+# Fields kept from each pulls_meta summary item. A tuple row is lighter than a per-PR dict,
+# both in pr_summaries_map and when it is pickled to the worker processes.
+PrSummary = namedtuple('PrSummary', ['url', 'title', 'body', 'labels'])
+
+# Summary used for detail files whose PR is missing from the pulls_meta summary file
+EMPTY_PR_SUMMARY = PrSummary(url='', title='', body='', labels=())
+
+
+def process_pull_request_detail_file(input_file_path, pr_info):
+    """
+    Parses one '<pr_number>.json' detail file and extracts the added lines of each changed file.
+    Runs in a worker process; returns the processed PR entry, or None if the file could not be processed.
+    """
+    file_name = os.path.basename(input_file_path)
+    pr_number = int(file_name[:-5])
+    try:
+        # Read only the filename and patch of each item (representing a file change) in the PR's metadata
+        file_changes = load_file_changes(input_file_path)
+
+        # The extracted filename and added lines for each file change
+        file_changes_list = [
+            {
+                "filename": filename,
+                "added_lines": extract_added_lines(patch)
+            }
+            for filename, patch in file_changes
+        ]
+
+        # Construct the entry for the current pull request
+        return {
+            "pr_number": pr_number,
+            "url": pr_info.url,
+            "title": pr_info.title,
+            "body": pr_info.body,
+            "file_changes": file_changes_list
+        }
+    except ValueError:
+        print(f"Error: Could not decode JSON from {input_file_path}. The file might be corrupted or not valid JSON.")
+    except Exception as e:
+        print(f"An unexpected error occurred while processing {file_name}: {e}")
+    return None
+
+
+class SafeFilenameTable(dict):
+    """
+    str.translate table mapping non-alphanumeric code points to '_' and keeping alphanumeric ones.
+    Entries are computed on first lookup and cached, so non-ASCII labels are covered as well.
+    """
+
+    def __missing__(self, code_point):
+        replacement = code_point if chr(code_point).isalnum() else ord('_')
+        self[code_point] = replacement
+        return replacement
+
+
+SAFE_FILENAME_TABLE = SafeFilenameTable()
+
+# Write buffer per label output file; entries are appended in small pieces, so batch them into fewer write calls
+LABEL_OUTPUT_BUFFER_SIZE = 256 * 1024
+
+
+def write_label_output_entry(label_outputs, processed_pulls_dir, safe_label_name, entry_bytes):
+    """
+    Appends one serialized PR entry to the JSON array streamed into the output file for a label,
+    opening the file and starting the array on first use. safe_label_name is the label name
+    already sanitized with SAFE_FILENAME_TABLE.
+    """
+    output_file_name = f"{safe_label_name}.json"
+
+    output = label_outputs.get(output_file_name)
+    try:
+        if output is None:
+            # Labels that sanitize to the same file name share one output file
+            output = label_outputs[output_file_name] = {'label': safe_label_name, 'file': None, 'count': 0}
+            output['file'] = open(os.path.join(processed_pulls_dir, output_file_name), 'wb',
+                                  buffering=LABEL_OUTPUT_BUFFER_SIZE)
+            output['file'].write(b'[')
+        if output['file'] is None:
+            return
+        output['file'].write(b',\n  ' if output['count'] else b'\n  ')
+        output['file'].write(entry_bytes)
+        output['count'] += 1
+    except Exception as e:
+        print(f"An error occurred while writing the output file for label '{safe_label_name}': {e}")
+        if output['file'] is not None:
+            output['file'].close()
+            output['file'] = None
+
+
+def parse_arguments():
+    """
+    Parses the command-line arguments described in the module docstring.
+    """
+    parser = argparse.ArgumentParser(
+        description="Create json files for pull request conversation and file changes for PR labels",
+        epilog='Example: compile_pull_requests_into_label_json_files.py YWxs.json "./gh_output" team-mirai policy')
+    parser.add_argument('base_PR_json', help="retrieved repo's pulls_meta json file path")
+    parser.add_argument('output_folder', help="folder where previously retrieved pull requests are stored "
+                                              "and where consolidated files are to be created")
+    parser.add_argument('owner', help="GitHub Repo owner")
+    parser.add_argument('repo', help="GitHub Repo")
+    parser.add_argument('--version', action='version', version="0.1")
+    return parser.parse_args()
+
 
 def process_pull_request_files():
     """
@@ -28,11 +279,11 @@ def process_pull_request_files():
     and categorizes/saves processed data into multiple JSON files based on PR labels.
     """
 
-    arguments = docopt(__doc__, version="0.1")
-    PULLS_META_SUMMARY_FILE = arguments["<base_PR_json>"]  #"YWxs.json"
-    OUTPUT_BASE_DIR = arguments["<output_folder>"]         # "./gh_output"
-    owner = arguments["<owner>"]                           #"team-mirai"
-    repo = arguments["<repo>"]                             # "policy"
+    arguments = parse_arguments()
+    PULLS_META_SUMMARY_FILE = arguments.base_PR_json  #"YWxs.json"
+    OUTPUT_BASE_DIR = arguments.output_folder         # "./gh_output"
+    owner = arguments.owner                           #"team-mirai"
+    repo = arguments.repo                             # "policy"
     print(f"\nProcessing repository: {owner}/{repo}")
 
     # Define the directory where pull request summary file is located
@@ -60,131 +311,92 @@ def process_pull_request_files():
     pulls_meta_summary_file_path = os.path.join(pulls_meta_dir, PULLS_META_SUMMARY_FILE)
 
     try:
-        with open(pulls_meta_summary_file_path, 'r', encoding='utf-8') as f:
-            json_meta_summary = json.load(f)
-            if isinstance(json_meta_summary, list):
-                for item in json_meta_summary:
-                    # Assuming 'number' key exists in the summary for PR number
-                    pr_number = item.get('number')
-                    if pr_number is not None:
-                        try:
-                            # Extract label names
-                            labels = [label.get('name') for label in item.get('labels', []) if label.get('name')]
-                            pr_summaries_map[int(pr_number)] = {
-                                'url': item.get('url', ''),
-                                'title': item.get('title', ''),
-                                'body': item.get('body', ''),
-                                'labels': labels # Store the extracted label names
-                            }
-                        except ValueError:
-                            print(f"Warning: Could not convert PR number '{pr_number}' to integer in {PULLS_META_SUMMARY_FILE}. Skipping this entry.")
-                        except Exception as e:
-                            print(f"Warning: Error processing labels for PR {pr_number} in {PULLS_META_SUMMARY_FILE}: {e}")
-            else:
-                print(f"Warning: {PULLS_META_SUMMARY_FILE} is not a list of PR summaries. 'url', 'body', and 'labels' fields might be missing in output.")
+        # Only url, title, body and label names are kept from each (possibly streamed) summary item
+        for item in iter_json_array_items(pulls_meta_summary_file_path):
+            # Assuming 'number' key exists in the summary for PR number
+            pr_number = item.get('number')
+            if pr_number is not None:
+                try:
+                    # Extract label names, interned since the same few labels repeat across all PRs
+                    labels = [sys.intern(label.get('name')) for label in item.get('labels', []) if label.get('name')]
+                    pr_summaries_map[int(pr_number)] = PrSummary(
+                        url=item.get('url', ''),
+                        title=item.get('title', ''),
+                        body=item.get('body', ''),
+                        labels=labels # Store the extracted label names
+                    )
+                except ValueError:
+                    print(f"Warning: Could not convert PR number '{pr_number}' to integer in {PULLS_META_SUMMARY_FILE}. Skipping this entry.")
+                except Exception as e:
+                    print(f"Warning: Error processing labels for PR {pr_number} in {PULLS_META_SUMMARY_FILE}: {e}")
+    except TypeError:
+        print(f"Warning: {PULLS_META_SUMMARY_FILE} is not a list of PR summaries. 'url', 'body', and 'labels' fields might be missing in output.")
     except FileNotFoundError:
         print(f"Warning: PR summary file not found at {pulls_meta_summary_file_path}. 'url', 'body', and 'labels' fields will be empty for all PRs.")
-    except json.JSONDecodeError:
+    except JSON_DECODE_ERRORS:
         print(f"Error: Could not decode JSON from {pulls_meta_summary_file_path}. Skipping PR summaries.")
     except Exception as e:
         print(f"An unexpected error occurred while loading PR summaries from {PULLS_META_SUMMARY_FILE}: {e}")
 
-    # This dictionary will store PRs categorized by their labels
-    # Key: label name (string), Value: list of processed PR entries
-    categorized_prs = {}
+    # Label output files are opened on first use and every processed PR is streamed into them,
+    # so the consolidated entries of all PRs are never held in memory at the same time.
+    # Key: output file name, Value: dict with the label name, open file (None after an error) and PR count
+    label_outputs = {}
 
     # --- Step 2: Iterate and Process Detailed PR Files from the new directory ---
-    for file_name in os.listdir(pr_detail_files_dir):
-        # Process only JSON files that look like pull request numbers (e.g., '123.json')
-        if file_name.endswith('.json') and file_name[:-5].isdigit():
-            input_file_path = os.path.join(pr_detail_files_dir, file_name)
-            pr_number_str = file_name[:-5]
-            pr_number = int(pr_number_str)
+    # Collect the detail files first so they can be parsed in parallel worker processes
+    detail_file_names = []
+    detail_file_paths = []
+    detail_pr_infos = []
+    with os.scandir(pr_detail_files_dir) as dir_entries:
+        for dir_entry in dir_entries:
+            file_name = dir_entry.name
+            # Process only JSON files that look like pull request numbers (e.g., '123.json')
+            if file_name.endswith('.json') and file_name[:-5].isdigit() and dir_entry.is_file():
+                pr_number = int(file_name[:-5])
+                detail_file_names.append(file_name)
+                detail_file_paths.append(dir_entry.path)
+                # Get the URL, title, body, and labels for this PR from the summary map
+                detail_pr_infos.append(pr_summaries_map.get(pr_number, EMPTY_PR_SUMMARY))
+            elif file_name.endswith('.json'):
+                print(f"Skipping non-PR-number JSON file in {pr_detail_files_dir}: {file_name}")
+
+    try:
+        # Parsing and patch scanning run in the workers; results are written out here in the main process
+        with ProcessPoolExecutor() as executor:
+            results = executor.map(process_pull_request_detail_file, detail_file_paths, detail_pr_infos, chunksize=16)
+            for file_name, pr_info, processed_pr_entry in zip(detail_file_names, detail_pr_infos, results):
+                print(f"Processing pull request detail file: {file_name}")
+                if processed_pr_entry is None:
+                    continue
+
+                pr_labels = pr_info.labels # Get the labels for this PR
+                # Serialize once as an element of an indented JSON array, then append it to each label's file
+                entry_bytes = json_dumps_bytes(processed_pr_entry).replace(b'\n', b'\n  ')
 
-            print(f"Processing pull request detail file: {file_name}")
+                # Categorize the processed PR entry by its labels ('no_label' category if it has none);
+                # labels that sanitize to the same file name get the entry only once.
+                # Sanitize label name for use as a filename (replace problematic characters)
+                # For simplicity, replacing non-alphanumeric with underscore.
+                # More robust sanitization might be needed depending on actual label names.
+                safe_label_names = dict.fromkeys(label_name.translate(SAFE_FILENAME_TABLE)
+                                                 for label_name in (pr_labels or ('no_label',)))
+                for safe_label_name in safe_label_names:
+                    write_label_output_entry(label_outputs, processed_pulls_dir, safe_label_name, entry_bytes)
 
+                print(f"  Successfully processed PR {processed_pr_entry['pr_number']} with labels: {pr_labels if pr_labels else 'No labels'}.")
+    finally:
+        # --- Step 3: Close the JSON arrays of all label output files ---
+        print("\nSaving categorized PR data to separate files...")
+        for output_file_name, output in label_outputs.items():
+            if output['file'] is None:
+                continue
             try:
-                # Open and read the source JSON file, ensuring UTF-8 encoding
-                with open(input_file_path, 'r', encoding='utf-8') as f:
-                    pr_meta_data = json.load(f)
-
-                # Get the URL, body, and labels for this PR from the summary map
-                pr_info = pr_summaries_map.get(pr_number, {'url': '', 'body': '', 'labels': []})
-                pr_url = pr_info['url']
-                pr_title = pr_info['title']
-                pr_body = pr_info['body']
-                pr_labels = pr_info['labels'] # Get the labels for this PR
-
-                # This list will store the extracted filename and added lines for the current PR's file changes
-                file_changes_list = []
-
-                # Iterate through each item (representing a file change) in the PR's metadata
-                for item in pr_meta_data:
-                    filename = item.get('filename')
-                    patch = item.get('patch')
-                    added_lines = []
-
-                    if patch:
-                        # Split the patch into individual lines
-                        lines = patch.split('\n')
-                        for line in lines:
-                            # Check if the line starts with '+' and is not a '+++' header line
-                            if line.startswith('+') and not line.startswith('+++'):
-                                # Add the line, removing the leading '+' character
-                                added_lines.append(line[1:])
-
-                    # Append the processed data for this file change
-                    file_changes_list.append({
-                        "filename": filename,
-                        "added_lines": added_lines
-                    })
-
-                # Construct the entry for the current pull request
-                processed_pr_entry = {
-                    "pr_number": pr_number,
-                    "url": pr_url,
-                    "title": pr_title,
-                    "body": pr_body,
-                    "file_changes": file_changes_list
-                }
-
-                # Categorize the processed PR entry by its labels
-                if pr_labels:
-                    for label_name in pr_labels:
-                        if label_name not in categorized_prs:
-                            categorized_prs[label_name] = []
-                        categorized_prs[label_name].append(processed_pr_entry)
-                else:
-                    # If no labels, add to 'no_label' category
-                    if 'no_label' not in categorized_prs:
-                        categorized_prs['no_label'] = []
-                    categorized_prs['no_label'].append(processed_pr_entry)
-
-                print(f"  Successfully processed PR {pr_number_str} with labels: {pr_labels if pr_labels else 'No labels'}.")
-
-            except json.JSONDecodeError:
-                print(f"Error: Could not decode JSON from {input_file_path}. The file might be corrupted or not valid JSON.")
+                with output['file'] as f:
+                    f.write(b'\n]')
+                print(f"  Saved {output['count']} PRs to: {output_file_name}")
             except Exception as e:
-                print(f"An unexpected error occurred while processing {file_name}: {e}")
-        elif file_name.endswith('.json'):
-            print(f"Skipping non-PR-number JSON file in {pr_detail_files_dir}: {file_name}")
-
-    # --- Step 3: Save All Categorized Data to Separate Output Files ---
-    print("\nSaving categorized PR data to separate files...")
-    for label_name, pr_list in categorized_prs.items():
-        # Sanitize label name for use as a filename (replace problematic characters)
-        # For simplicity, replacing non-alphanumeric with underscore.
-        # More robust sanitization might be needed depending on actual label names.
-        safe_label_name = "".join(c if c.isalnum() else "_" for c in label_name)
-        output_file_name = f"{safe_label_name}.json"
-        output_file_path = os.path.join(processed_pulls_dir, output_file_name)
-
-        try:
-            with open(output_file_path, 'w', encoding='utf-8') as f:
-                json.dump(pr_list, f, ensure_ascii=False, indent=2)
-            print(f"  Saved {len(pr_list)} PRs to: {output_file_name}")
-        except Exception as e:
-            print(f"An error occurred while writing the output file for label '{label_name}': {e}")
+                print(f"An error occurred while writing the output file for label '{output['label']}': {e}")
 
 
 # --- Script Entry Point ---
@@ -1,57 +1,77 @@
 import json
+import mmap
 import sys
 import os
-from collections import defaultdict
-from datetime import datetime
-import pytz # Import the pytz library
+from collections import Counter
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta, timezone
+from operator import itemgetter
 
-def process_github_data(json_data):
+# orjson parses straight from bytes-like buffers (including a memory-mapped file) when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Japan Standard Timezone (JST): a fixed UTC+9 offset, as Japan has not observed DST since 1951,
+# so no timezone database (tzdata) is needed
+JST_TIMEZONE = timezone(timedelta(hours=9), 'JST')
+
+
+def to_jst_date(created_at_str):
+    """
+    Converts an ISO 8601 UTC timestamp to its Japan Standard Time (JST) date as 'YYYY-MM-DD'.
+    """
+    dt_object = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
+    return dt_object.astimezone(JST_TIMEZONE).strftime('%Y-%m-%d')
+
+
+def fast_to_jst_date(created_at_str):
+    """
+    Fast path of to_jst_date for GitHub's fixed 'YYYY-MM-DDTHH:MM:SSZ' timestamps.
+    JST is a fixed UTC+9 offset, so the date only changes when the UTC hour is 15 or later;
+    any other timestamp format falls back to to_jst_date.
+    """
+    if len(created_at_str) != 20 or created_at_str[10] != 'T' or created_at_str[19] != 'Z':
+        return to_jst_date(created_at_str)
+    if int(created_at_str[11:13]) < 15:
+        return created_at_str[:10]
+    next_day = date(int(created_at_str[0:4]), int(created_at_str[5:7]), int(created_at_str[8:10])) + timedelta(days=1)
+    return next_day.isoformat()
+
+
+def process_github_data(json_data, precise=False):
     """
     Processes a list of GitHub pull request data to generate reports.
 
     Args:
-        json_data (str): A string containing the JSON data of pull requests.
+        json_data (bytes-like or str): The JSON data of pull requests. A memoryview
+            (e.g. of a memory-mapped file) is only accepted when orjson is installed.
+        precise (bool): Convert every timestamp with a full datetime/timezone round-trip
+            instead of the fixed-offset fast path.
 
     Returns:
         None. Prints the formatted tables directly.
     """
     try:
-        # Load the JSON string into a Python list of dictionaries
-        pull_requests = json.loads(json_data)
+        # Load the JSON data into a Python list of dictionaries
+        pull_requests = orjson.loads(json_data) if orjson is not None else json.loads(json_data)
     except json.JSONDecodeError:
         print("Error: The file content is not valid JSON. Please check the file.")
         return
 
-    # A dictionary to hold the count of PRs per date.
-    date_counts = defaultdict(int)
+    # Extract the PR number and creation timestamp columns, skipping incomplete entries
+    pr_rows = [(pr.get("number"), pr.get("created_at")) for pr in pull_requests]
+    pr_rows = [row for row in pr_rows if row[0] and row[1]]
+    pr_numbers = [row[0] for row in pr_rows]
+    convert_date = to_jst_date if precise else fast_to_jst_date
+    formatted_dates = [convert_date(row[1]) for row in pr_rows]
 
-    # A list to store individual PR numbers and their creation dates.
-    pr_list = []
+    # The count of PRs per date.
+    date_counts = Counter(formatted_dates)
 
-    # Define the Japan Standard Timezone (JST)
-    jst_timezone = pytz.timezone('Asia/Tokyo')
-
-    for pr in pull_requests:
-        pr_number = pr.get("number")
-        created_at_str = pr.get("created_at")
-
-        if not pr_number or not created_at_str:
-            continue
-
-        # Convert the ISO 8601 timestamp string to a datetime object
-        dt_object = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-
-        # Convert the UTC datetime object to Japan Standard Time (JST)
-        dt_object_jst = dt_object.astimezone(jst_timezone)
-
-        # Format the date into 'YYYY-MM-DD'
-        formatted_date = dt_object_jst.strftime('%Y-%m-%d')
-
-        # Increment the count for this date
-        date_counts[formatted_date] += 1
-
-        # Add the PR number and formatted date to our list
-        pr_list.append({"number": pr_number, "date": formatted_date})
+    # Individual PR numbers and their creation dates, sorted by PR number.
+    pr_list = sorted(zip(pr_numbers, formatted_dates), key=itemgetter(0))
 
     # --- Print the Summary Table ---
     print("Summary of Items by Date")
@@ -64,9 +84,9 @@ def process_github_data(json_data):
     if not sorted_dates:
         print("| No data available         |")
     else:
-        for date in sorted_dates:
-            count = date_counts[date]
-            print(f"| {date} | {count:<15} |")
+        for date_str in sorted_dates:
+            count = date_counts[date_str]
+            print(f"| {date_str} | {count:<15} |")
     print("+------------+-----------------+")
 
     print("\n" + "=" * 30 + "\n")
@@ -78,9 +98,8 @@ def process_github_data(json_data):
     if not pr_list:
         print("No pull requests found.")
     else:
-        pr_list.sort(key=lambda x: x['number'])
-        for item in pr_list:
-            print(f"PR: {item['number']}  -  Date: {item['date']}")
+        for pr_number, formatted_date in pr_list:
+            print(f"PR: {pr_number}  -  Date: {formatted_date}")
     print("---------------------------------")
 
 
@@ -88,29 +107,38 @@ def main():
     """
     Main function to handle command-line arguments and file reading.
     """
+    # '--precise' disables the fixed-offset date conversion fast path
+    precise = '--precise' in sys.argv[1:]
+    positional_args = [arg for arg in sys.argv[1:] if arg != '--precise']
+
     # Check if the user provided a file path as a command-line argument
-    if len(sys.argv) < 2:
-        print("Usage: python process_prs.py <path_to_your_json_file>")
+    if not positional_args:
+        print("Usage: python process_prs.py <path_to_your_json_file> [--precise]")
         sys.exit(1)  # Exit with an error code
 
-    file_path = sys.argv[1]
+    file_path = positional_args[0]
 
     # Check if the provided file path actually exists
     if not os.path.exists(file_path):
         print(f"Error: The file '{file_path}' was not found.")
         sys.exit(1)
 
-    # Read the JSON data from the specified file
-    try:
-        # Use 'utf-8' encoding for broad compatibility
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_from_file = f.read()
-    except Exception as e:
-        print(f"Error reading the file: {e}")
-        sys.exit(1)
-
-    # Call the processing function with the data from the file
-    process_github_data(json_from_file)
+    # Read the JSON data from the specified file; with orjson the file is memory-mapped
+    # and parsed in place instead of being copied into a string first
+    with ExitStack() as stack:
+        try:
+            f = stack.enter_context(open(file_path, 'rb'))
+            if orjson is not None and os.fstat(f.fileno()).st_size > 0:
+                mapped_file = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                json_from_file = stack.enter_context(memoryview(mapped_file))
+            else:
+                json_from_file = f.read()
+        except Exception as e:
+            print(f"Error reading the file: {e}")
+            sys.exit(1)
+
+        # Call the processing function with the data from the file
+        process_github_data(json_from_file, precise=precise)
 
 
 # This ensures the main() function is called only when the script is executed directly
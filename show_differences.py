@@ -2,7 +2,7 @@
 Create html pages to show changes proposed by pull requests
 
 Usage:
-  show_differences.py <output_folder>
+  show_differences.py <output_folder> [--pretty-cache]
   show_differences.py -h | --help
 
   <base_folder>: folder where retrieved pull requests are going to be stored
@@ -13,19 +13,32 @@ Examples:
   show_differences.py "./gh_output"
 
 Options:
-  -h --help     Show this screen.
-  --version     Show version.
+  -h --help       Show this screen.
+  --version       Show version.
+  --pretty-cache  Write the JSON cache files indented, for inspection.
 """
 import requests
 import json
 import os
+import posixpath
 import base64
+import functools
+import hashlib
 import html
+import io
+import mmap
 import time
-import shutil  # For rmtree, if uncommented
 import re  # For parsing patch hunks
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from docopt import docopt
 
+# orjson is used for the JSON caches and page payloads when installed; the stdlib json module is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # --- Configuration ---
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 if not GITHUB_TOKEN:
@@ -38,6 +51,7 @@ if not GITHUB_TOKEN:
 
 arguments = docopt(__doc__, version="0.1")
 OUTPUT_BASE_DIR = arguments["<output_folder>"]         # "./gh_output"
+PRETTY_CACHE = arguments["--pretty-cache"]  # Compact cache JSON unless indentation is requested
 
 API_BASE_URL = "https://api.github.com"
 HEADERS = {
@@ -50,9 +64,46 @@ HEADERS = {
 DIFF2HTML_UI_JS_URL = "https://cdn.jsdelivr.net/npm/diff2html/bundles/js/diff2html-ui.min.js"
 DIFF2HTML_CSS_URL = "https://cdn.jsdelivr.net/npm/diff2html/bundles/css/diff2html.min.css"
 MAX_FILE_SIZE_FOR_CONTENT_DISPLAY = 5 * 1024 * 1024  # 5MB limit for displaying content directly in HTML to avoid browser lag
+BINARY_SNIFF_BYTES = 8192  # A NUL byte within this many leading bytes marks a file as binary
+MAX_CONCURRENT_REQUESTS = 8  # Worker threads (and pooled HTTP connections) for concurrent API fetches
+RATE_LIMIT_THROTTLE_THRESHOLD = 50  # Start pacing API requests when fewer requests than this remain
+RAW_CACHE_MMAP_THRESHOLD = 64 * 1024  # Cached blobs larger than this are memory-mapped instead of read into memory
+HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")  # Unified diff hunk header
+# Hunk headers and '+'/'-'/' ' body lines of a patch; lines are delimited by the same characters
+# str.splitlines() splits on, so the scan sees the same lines as a splitlines() loop would
+LINE_BREAK_CHARS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+PATCH_LINE_RE = re.compile(f"(?:^|(?<=[{LINE_BREAK_CHARS}]))(@@|[-+ ])([^{LINE_BREAK_CHARS}]*)")
+
+GRAPHQL_URL = f"{API_BASE_URL}/graphql"
+# One GraphQL request returns a whole page of PRs with all the fields the REST pulls list provided
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $repo: String!, $states: [PullRequestState!], $first: Int!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    pullRequests(first: $first, after: $cursor, states: $states, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title body url state createdAt updatedAt closedAt mergedAt
+        author { login }
+        labels(first: 100) { nodes { name } }
+      }
+    }
+  }
+}
+"""
+GRAPHQL_PR_STATES = {'open': ['OPEN'], 'closed': ['CLOSED', 'MERGED'], 'all': None}
 
 
 # --- Caching Utilities ---
+ENSURED_DIRS = set()  # Directories already created (or found to exist) during this run
+
+
+def ensure_dir(dir_path):
+    """os.makedirs(dir_path, exist_ok=True), called at most once per directory per run."""
+    if dir_path not in ENSURED_DIRS:
+        os.makedirs(dir_path, exist_ok=True)
+        ENSURED_DIRS.add(dir_path)
+
+
 def get_cache_path(owner, repo, cache_type, identifier=""):
     """
     Determines the file path for a cached item.
@@ -74,14 +125,21 @@ def get_cache_path(owner, repo, cache_type, identifier=""):
     else:
         path = os.path.join(base_cache_dir, f"{cache_type}.json")
 
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ensure_dir(os.path.dirname(path))
     return path
 
 
 def save_json_cache(file_path, data):
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        if orjson is not None:
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if PRETTY_CACHE else None))
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                if PRETTY_CACHE:
+                    json.dump(data, f, indent=2)
+                else:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
     except Exception as e:
         print(f"Warning: Could not save JSON cache to {file_path}: {e}")
 
@@ -89,6 +147,9 @@ def save_json_cache(file_path, data):
 def load_json_cache(file_path):
     if os.path.exists(file_path):
         try:
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
@@ -97,6 +158,23 @@ def load_json_cache(file_path):
     return None
 
 
+def save_etag_cache(file_path, etag):
+    """Stores the ETag of a cached API response in a sidecar file next to the cache file."""
+    try:
+        with open(file_path + '.etag', 'w', encoding='utf-8') as f:
+            f.write(etag)
+    except Exception as e:
+        print(f"Warning: Could not save ETag for {file_path}: {e}")
+
+
+def load_etag_cache(file_path):
+    try:
+        with open(file_path + '.etag', 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
 def save_raw_cache(file_path, content_bytes):
     try:
         with open(file_path, 'wb') as f:
@@ -106,9 +184,15 @@ def save_raw_cache(file_path, content_bytes):
 
 
 def load_raw_cache(file_path):
+    """
+    Returns the cached bytes, or a read-only mmap of the file for blobs above RAW_CACHE_MMAP_THRESHOLD.
+    Both support len(), slicing and str(data, 'utf-8').
+    """
     if os.path.exists(file_path):
         try:
             with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > RAW_CACHE_MMAP_THRESHOLD:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
                 return f.read()
         except Exception as e:
             print(f"Warning: Could not load raw cache from {file_path}: {e}")
@@ -116,6 +200,28 @@ def load_raw_cache(file_path):
     return None
 
 
+def graphql_pull_request_to_rest(node, owner, repo):
+    """
+    Converts a GraphQL pullRequest node into the fields of a REST pulls list item,
+    so the pulls_meta cache keeps the format its readers expect.
+    """
+    return {
+        'url': f"{API_BASE_URL}/repos/{owner}/{repo}/pulls/{node['number']}",
+        'html_url': node['url'],
+        'number': node['number'],
+        'state': 'open' if node['state'] == 'OPEN' else 'closed',
+        'title': node['title'],
+        # Deleted accounts have no author; the REST API reports them as 'ghost'
+        'user': {'login': node['author']['login'] if node['author'] else 'ghost'},
+        'body': node['body'] or None,
+        'labels': [{'name': label['name']} for label in node['labels']['nodes']],
+        'created_at': node['createdAt'],
+        'updated_at': node['updatedAt'],
+        'closed_at': node['closedAt'],
+        'merged_at': node['mergedAt'],
+    }
+
+
 # --- GitHub API Interaction Class ---
 class GitHubAPI:
     def __init__(self, owner, repo):
@@ -123,6 +229,13 @@ class GitHubAPI:
         self.repo = repo
         self.rate_limit_remaining = None
         self.rate_limit_reset_time = None
+        # Earliest time the next paced request may go out (shared by the worker threads)
+        self._throttle_lock = threading.Lock()
+        self._next_request_at = 0.0
+        # One session for all API calls, so connections (and their TLS handshakes) are reused
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
 
     def _update_rate_limit_info(self, response_headers):
         if 'X-RateLimit-Remaining' in response_headers:
@@ -130,9 +243,24 @@ class GitHubAPI:
         if 'X-RateLimit-Reset' in response_headers:
             self.rate_limit_reset_time = int(response_headers['X-RateLimit-Reset'])
 
+    def _throttle(self):
+        """
+        Paces API calls once the rate limit runs low, spreading the remaining requests over the time
+        left until the limit resets. Requests are not delayed otherwise.
+        """
+        remaining, reset_time = self.rate_limit_remaining, self.rate_limit_reset_time
+        if remaining is None or reset_time is None or remaining >= RATE_LIMIT_THROTTLE_THRESHOLD:
+            return
+        # Concurrent callers each reserve the next request slot, so together they keep to the pace
+        with self._throttle_lock:
+            now = time.time()
+            request_at = max(now, self._next_request_at)
+            self._next_request_at = request_at + max(0, (reset_time - now) / max(1, remaining))
+        time.sleep(request_at - now)
+
     def _request(self, url, params=None, is_raw_content=False):
         try:
-            response = requests.get(url, headers=HEADERS, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             self._update_rate_limit_info(response.headers)
             response.raise_for_status()
 
@@ -149,20 +277,62 @@ class GitHubAPI:
             print(f"Request Error: {e} for URL: {url}")
         return None
 
-    def get_repo_contents(self, dir_path=''):
-        cache_file = get_cache_path(self.owner, self.repo, 'contents_metadata', dir_path)
+    def _request_revalidated(self, url, cache_file, params=None):
+        """
+        Fetches a JSON resource, revalidating an existing cache_file with its stored ETag.
+        A 304 response (which does not count against the rate limit) returns the cached data;
+        so does any request error, so a cached run keeps working offline.
+        """
         cached_data = load_json_cache(cache_file)
-        if cached_data:
+        etag = load_etag_cache(cache_file) if cached_data else None
+        try:
+            response = self.session.get(url, params=params, timeout=30,
+                                        headers={'If-None-Match': etag} if etag else None)
+            self._update_rate_limit_info(response.headers)
+            if response.status_code == 304:
+                return cached_data
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.HTTPError as e:
+            print(f"HTTP Error: {e.response.status_code} for URL: {url}")
+            print(f"Response: {e.response.text}")
+            return cached_data
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Request Error: {e} for URL: {url}")
             return cached_data
 
-        print(f"Fetching repo contents: '{dir_path if dir_path else "root"}'")
-        url = f"{API_BASE_URL}/repos/{self.owner}/{self.repo}/contents/{dir_path}"
-        data = self._request(url)
         if data:
             save_json_cache(cache_file, data)
-        time.sleep(0.05)
+            if response.headers.get('ETag'):
+                save_etag_cache(cache_file, response.headers['ETag'])
         return data
 
+    def get_repo_contents(self, dir_path=''):
+        cache_file = get_cache_path(self.owner, self.repo, 'contents_metadata', dir_path)
+        if not os.path.exists(cache_file):
+            print(f"Fetching repo contents: '{dir_path if dir_path else "root"}'")
+        url = f"{API_BASE_URL}/repos/{self.owner}/{self.repo}/contents/{dir_path}"
+        data = self._request_revalidated(url, cache_file)
+        self._throttle()
+        return data
+
+    def get_repo_contents_tree(self, root_dir_path=''):
+        """
+        Fetches the listings of a directory and all of its subdirectories, one tree level at a time
+        with the listings of each level requested concurrently over the shared session.
+        Returns a dict mapping each directory path to its listing (None if the fetch failed).
+        """
+        listings = {}
+        dir_paths = [root_dir_path]
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            while dir_paths:
+                subdir_paths = []
+                for dir_path, items_in_dir in zip(dir_paths, executor.map(self.get_repo_contents, dir_paths)):
+                    listings[dir_path] = items_in_dir
+                    subdir_paths.extend(item['path'] for item in items_in_dir or () if item['type'] == 'dir')
+                dir_paths = subdir_paths
+        return listings
+
     def get_file_blob_content(self, blob_sha):
         cache_file = get_cache_path(self.owner, self.repo, 'file_content_blob', blob_sha)
         cached_data = load_raw_cache(cache_file)
@@ -175,25 +345,82 @@ class GitHubAPI:
 
         if blob_metadata and blob_metadata.get('encoding') == 'base64' and 'content' in blob_metadata:
             try:
-                content_base64 = blob_metadata['content'].replace('\n', '')
-                decoded_bytes = base64.b64decode(content_base64)
+                # b64decode (validate=False) already skips the line breaks GitHub inserts every 60 chars
+                decoded_bytes = base64.b64decode(blob_metadata['content'])
                 save_raw_cache(cache_file, decoded_bytes)
-                time.sleep(0.05)
+                self._throttle()
                 return decoded_bytes
             except Exception as e:
                 print(f"Error decoding base64 content for blob {blob_sha}: {e}")
         elif blob_metadata:
             print(f"Warning: Blob {blob_sha} content not base64 or 'content' field missing. Data: {blob_metadata}")
 
-        time.sleep(0.05)
+        self._throttle()
         return None
 
+    def get_file_blob_size(self, blob_sha):
+        """Returns the size of a cached blob from the file system without reading it, or None if not cached."""
+        try:
+            return os.path.getsize(get_cache_path(self.owner, self.repo, 'file_content_blob', blob_sha))
+        except OSError:
+            return None
+
     def get_pull_requests(self, state='all', per_page=100):
         cache_file = get_cache_path(self.owner, self.repo, 'pulls_meta', state)
         cached_data = load_json_cache(cache_file)
         if cached_data is not None:
             return cached_data
 
+        all_pull_requests = self._get_pull_requests_graphql(state, per_page)
+        if all_pull_requests is None:
+            print("  Falling back to REST pagination for the PR list.")
+            all_pull_requests = self._get_pull_requests_rest(state, per_page)
+        save_json_cache(cache_file, all_pull_requests)
+        return all_pull_requests
+
+    def _get_pull_requests_graphql(self, state, per_page):
+        """
+        Fetches the PR list through the GraphQL API, up to 100 PRs per request, and returns
+        it in the shape of the REST pulls list. Returns None if the query fails.
+        """
+        print(f"Fetching PR list (state: {state}) via GraphQL, handling pagination...")
+        all_pull_requests = []
+        variables = {'owner': self.owner, 'repo': self.repo, 'states': GRAPHQL_PR_STATES.get(state),
+                     'first': min(per_page, 100), 'cursor': None}
+        page_num = 1
+        while True:
+            print(f"  Fetching PRs page {page_num}...")
+            try:
+                response = self.session.post(GRAPHQL_URL, json={'query': PULL_REQUESTS_QUERY, 'variables': variables},
+                                             timeout=30)
+                # The rate limit headers here report GraphQL's separate points budget, so they are not
+                # recorded: rate_limit_remaining/rate_limit_reset_time pace the REST calls
+                response.raise_for_status()
+                result = response.json()
+                if result.get('errors') or not (result.get('data') or {}).get('repository'):
+                    print(f"GraphQL Error while fetching PRs page {page_num}: {result.get('errors')}")
+                    return None
+                connection = result['data']['repository']['pullRequests']
+            except requests.exceptions.HTTPError as e:
+                print(f"HTTP Error: {e.response.status_code} while fetching PRs page {page_num} from {GRAPHQL_URL}")
+                return None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Request Error: {e} while fetching PRs page {page_num} from {GRAPHQL_URL}")
+                return None
+
+            all_pull_requests.extend(
+                graphql_pull_request_to_rest(node, self.owner, self.repo) for node in connection['nodes'])
+            page_info = connection['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            variables['cursor'] = page_info['endCursor']
+            page_num += 1
+            self._throttle()
+
+        print(f"  Fetched a total of {len(all_pull_requests)} PRs across {page_num} page(s).")
+        return all_pull_requests
+
+    def _get_pull_requests_rest(self, state, per_page):
         print(f"Fetching PR list (state: {state}), handling pagination...")
         all_pull_requests = []
         current_url = f"{API_BASE_URL}/repos/{self.owner}/{self.repo}/pulls"
@@ -202,7 +429,7 @@ class GitHubAPI:
         while current_url:
             print(f"  Fetching PRs page {page_num}...")
             try:
-                response = requests.get(current_url, headers=HEADERS, params=current_params, timeout=30)
+                response = self.session.get(current_url, params=current_params, timeout=30)
                 self._update_rate_limit_info(response.headers)
                 response.raise_for_status()
 
@@ -216,7 +443,7 @@ class GitHubAPI:
                     page_num += 1
                 else:
                     current_url = None
-                time.sleep(0.05)
+                self._throttle()
             except requests.exceptions.HTTPError as e:
                 print(
                     f"HTTP Error: {e.response.status_code} while fetching PRs page {page_num} from {current_url.split('?')[0] if current_url else 'N/A'}")
@@ -236,7 +463,6 @@ class GitHubAPI:
                 current_url = None;
                 all_pull_requests = [];
                 break
-        save_json_cache(cache_file, all_pull_requests)
         if all_pull_requests:
             print(f"  Fetched a total of {len(all_pull_requests)} PRs across {page_num} page(s).")
         elif page_num > 1 and not all_pull_requests:
@@ -247,211 +473,186 @@ class GitHubAPI:
 
     def get_pull_request_files(self, pr_number):
         cache_file = get_cache_path(self.owner, self.repo, 'pull_files_detail', str(pr_number))
-        cached_data = load_json_cache(cache_file)
-        if cached_data: return cached_data
-        print(f"Fetching files for PR #{pr_number} (first page)...")
+        if not os.path.exists(cache_file):
+            print(f"Fetching files for PR #{pr_number} (first page)...")
         url = f"{API_BASE_URL}/repos/{self.owner}/{self.repo}/pulls/{pr_number}/files"
         params = {'per_page': 300}
-        data = self._request(url, params=params)
-        if data: save_json_cache(cache_file, data)
-        time.sleep(0.05)
+        data = self._request_revalidated(url, cache_file, params=params)
+        self._throttle()
         return data
 
+    def get_pull_request_files_bulk(self, pr_numbers):
+        """
+        Fetches the changed files of several PRs concurrently over the shared session.
+        Returns a dict mapping each PR number to its files data (None if the fetch failed).
+        """
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            return dict(zip(pr_numbers, executor.map(self.get_pull_request_files, pr_numbers)))
+
 
 # --- Patch Application Utility ---
-def apply_patch_to_content(base_content_str, patch_string, pr_details_for_annotation=None):
+def apply_patch_to_content(base_content_str, patch_string, pr_details_for_annotation=None, base_lines_escaped=None):
     """
     Applies a unidiff patch string to a base content string, returning HTML with highlights.
     If pr_details_for_annotation is provided, added lines are wrapped in spans with PR info.
+    base_lines_escaped may pass in html.escape(base_content_str).splitlines() when the caller
+    applies several patches to the same file, so the base is only escaped once.
     """
     if not patch_string:
         return html.escape(base_content_str) if base_content_str else ""
     if base_content_str is None:
         base_content_str = ""
 
-    base_lines = base_content_str.splitlines()
-    patched_lines_html_result = []
-
-    raw_patch_lines = patch_string.splitlines()
-    hunk_sections = []
-    current_hunk_body = None
-    current_hunk_header = None
-
-    for line in raw_patch_lines:
-        if line.startswith("@@"):
-            if current_hunk_header is not None and current_hunk_body is not None:
-                hunk_sections.append((current_hunk_header, current_hunk_body))
-            current_hunk_header = line
-            current_hunk_body = []
-        elif current_hunk_body is not None:
-            if line.startswith(("+", "-", " ", "\\")):
-                current_hunk_body.append(line)
-    if current_hunk_header is not None and current_hunk_body is not None:
-        hunk_sections.append((current_hunk_header, current_hunk_body))
-
-    if not hunk_sections:
-        is_only_no_newline_meta = False
-        if "\\ No newline at end of file" in patch_string:
-            is_only_no_newline_meta = not any(
-                pline.startswith(('+', '-')) for pline in raw_patch_lines
-                if not pline.startswith(('@@', '---', '+++', 'diff', 'index', '\\')))
-        if is_only_no_newline_meta:
-            return html.escape(base_content_str)
-        return html.escape(base_content_str)
+    hunk_header_match = HUNK_HEADER_RE.match
+    _esc = html.escape
+    if pr_details_for_annotation:
+        pr_num = pr_details_for_annotation.get('number', 'N/A')
+        pr_title = _esc(pr_details_for_annotation.get('title', 'Unknown PR'))
+        added_line_open_tag = f'<span class="added-line pr-annotated" title="PR #{pr_num}: {pr_title}">'
+    else:
+        added_line_open_tag = '<span class="added-line">'
+
+    if not base_content_str:
+        # New (or empty) file: there are no base lines to copy or skip, so the result is just
+        # the added and context lines of the hunks whose header parses
+        new_file_lines_html = []
+        in_hunk = False
+        for patch_line in patch_string.splitlines():
+            if patch_line.startswith("@@"):
+                in_hunk = hunk_header_match(patch_line) is not None
+            elif in_hunk:
+                if patch_line.startswith("+"):
+                    new_file_lines_html.append(f'{added_line_open_tag}{_esc(patch_line[1:])}</span>')
+                elif patch_line.startswith(" "):
+                    new_file_lines_html.append(_esc(patch_line[1:]))
+        return "\n".join(new_file_lines_html)
+
+    # Escaping never adds or removes line breaks, so escaping the whole text once and then
+    # splitting gives the same lines as escaping each line separately
+    if base_lines_escaped is None:
+        base_lines_escaped = html.escape(base_content_str).splitlines()
+    # Every output line is written followed by '\n'; the final newline is dropped on return
+    patched_html_buffer = io.StringIO()
+    write_html = patched_html_buffer.write
+
+    def write_base_lines(start_idx, end_idx):
+        # Unchanged base ranges are copied with one join and write instead of per-line writes
+        if start_idx < end_idx:
+            write_html("\n".join(base_lines_escaped[start_idx:end_idx]))
+            write_html("\n")
 
     current_base_line_idx = 0
 
-    for header_line, body_lines in hunk_sections:
-        match = re.search(r"@@ -(\d+)(,(\d+))? \+(\d+)(,(\d+))? @@", header_line)
-        if not match:
-            continue
+    # Single pass over the patch: each hunk header positions the base copy, and its body lines
+    # are applied as they are read. Lines of a hunk whose header does not parse are skipped.
+    found_hunk = False
+    in_hunk = False
+    for patch_line in patch_string.splitlines():
+        if patch_line.startswith("@@"):
+            found_hunk = True
+            match = hunk_header_match(patch_line)
+            in_hunk = match is not None
+            if not in_hunk:
+                continue
 
-        old_start_1based = int(match.group(1))
-        lines_to_copy_from_base_before_hunk = (old_start_1based - 1) - current_base_line_idx
-
-        if lines_to_copy_from_base_before_hunk > 0:
-            end_copy_idx = current_base_line_idx + lines_to_copy_from_base_before_hunk
-            if end_copy_idx > len(base_lines): end_copy_idx = len(base_lines)
-            for i in range(current_base_line_idx, end_copy_idx):
-                patched_lines_html_result.append(html.escape(base_lines[i]))
-            current_base_line_idx = end_copy_idx
-        elif lines_to_copy_from_base_before_hunk < 0:
-            if old_start_1based > 0:  # old_start_1based can be 0 for new files
-                current_base_line_idx = old_start_1based - 1
-
-        for hunk_body_line in body_lines:
-            escaped_line_content = html.escape(hunk_body_line[1:])
-            if hunk_body_line.startswith("+"):
-                if pr_details_for_annotation:
-                    pr_num = pr_details_for_annotation.get('number', 'N/A')
-                    pr_title = html.escape(pr_details_for_annotation.get('title', 'Unknown PR'))
-                    patched_lines_html_result.append(
-                        f'<span class="added-line pr-annotated" title="PR #{pr_num}: {pr_title}">'
-                        f'{escaped_line_content}</span>'
-                    )
-                else:
-                    patched_lines_html_result.append(f'<span class="added-line">{escaped_line_content}</span>')
-            elif hunk_body_line.startswith("-"):
-                if current_base_line_idx < len(base_lines):
+            old_start_1based = int(match.group(1))
+            lines_to_copy_from_base_before_hunk = (old_start_1based - 1) - current_base_line_idx
+
+            if lines_to_copy_from_base_before_hunk > 0:
+                end_copy_idx = current_base_line_idx + lines_to_copy_from_base_before_hunk
+                if end_copy_idx > len(base_lines_escaped): end_copy_idx = len(base_lines_escaped)
+                write_base_lines(current_base_line_idx, end_copy_idx)
+                current_base_line_idx = end_copy_idx
+            elif lines_to_copy_from_base_before_hunk < 0:
+                if old_start_1based > 0:  # old_start_1based can be 0 for new files
+                    current_base_line_idx = old_start_1based - 1
+        elif in_hunk:
+            if patch_line.startswith("+"):
+                write_html(f'{added_line_open_tag}{_esc(patch_line[1:])}</span>\n')
+            elif patch_line.startswith("-"):
+                if current_base_line_idx < len(base_lines_escaped):
                     current_base_line_idx += 1
-            elif hunk_body_line.startswith(" "):
-                patched_lines_html_result.append(escaped_line_content)
-                if current_base_line_idx < len(base_lines):
+            elif patch_line.startswith(" "):
+                write_html(_esc(patch_line[1:]))
+                write_html("\n")
+                if current_base_line_idx < len(base_lines_escaped):
                     current_base_line_idx += 1
-            elif hunk_body_line.startswith("\\"):
-                pass
-
-    if current_base_line_idx < len(base_lines):
-        for i in range(current_base_line_idx, len(base_lines)):
-            patched_lines_html_result.append(html.escape(base_lines[i]))
 
-    return "\n".join(patched_lines_html_result)
-
-
-# --- HTML Generation Utilities ---
-def ensure_assets(assets_dir_abs):
-    os.makedirs(assets_dir_abs, exist_ok=True)
-    js_filename = "diff2html-ui.min.js";
-    css_filename = "diff2html.min.css"
-    js_path_abs = os.path.join(assets_dir_abs, js_filename);
-    css_path_abs = os.path.join(assets_dir_abs, css_filename)
-    assets_ok = True
-    if not os.path.exists(js_path_abs):
-        print(f"Downloading {js_filename}...");
-        response_js = None
-        try:
-            response_js = requests.get(DIFF2HTML_UI_JS_URL, timeout=30);
-            response_js.raise_for_status()
-            with open(js_path_abs, 'w', encoding='utf-8') as f:
-                f.write(response_js.text)
-        except Exception as e:
-            print(f"Failed to download {js_filename}: {e}"); assets_ok = False
-    if not os.path.exists(css_path_abs):
-        print(f"Downloading {css_filename}...");
-        response_css = None
-        try:
-            response_css = requests.get(DIFF2HTML_CSS_URL, timeout=30);
-            response_css.raise_for_status()
-            with open(css_path_abs, 'w', encoding='utf-8') as f:
-                f.write(response_css.text)
-        except Exception as e:
-            print(f"Failed to download {css_filename}: {e}"); assets_ok = False
-    return assets_ok
-
-
-def generate_file_html_page(owner, repo, file_info, base_content_str, is_binary, is_too_large,
-                            relevant_prs_info, html_file_path_abs, assets_rel_path, pulls_dir_rel_path,
-                            all_prs_interleaved_lines_json):
-    file_path_display = html.escape(file_info['path'])
-    pr_options_html = '<option value="base_content">Show Base Content</option>'
-    # Changed option value to match JS, and text for clarity
-    pr_options_html += '<option value="all_pr_changes_interleaved">Show All PR Additions (Interleaved View)</option>'
+    if not found_hunk:
+        return html.escape(base_content_str)
 
-    js_pr_data = {}
+    if current_base_line_idx < len(base_lines_escaped):
+        write_base_lines(current_base_line_idx, len(base_lines_escaped))
 
-    for pr_num_int, pr_data in relevant_prs_info.items():
-        pr_num_str = str(pr_num_int)
-        pr_title_escaped = html.escape(f"#{pr_num_str}: {pr_data['title']}")
-        pr_options_html += f'<option value="{pr_num_str}">{pr_title_escaped}</option>'
+    return patched_html_buffer.getvalue()[:-1]
 
-        js_pr_data[pr_num_str] = {
-            "title": pr_data['title'],
-            "patch": pr_data.get('patch_for_this_file'),
-            "html_url": pr_data['html_url'],
-            "merged_content_html": pr_data.get('merged_content_html_for_this_file'),
-            "local_pr_page_link": os.path.join(pulls_dir_rel_path, f"{pr_num_str}.html").replace("\\", "/")
-        }
 
-    if is_binary:
-        base_content_html_escaped = html.escape(
-            f"[Binary File - Content not displayed. Size: {file_info.get('size', 0)} bytes]")
-    elif is_too_large:
-        base_content_html_escaped = html.escape(
-            f"[File Too Large ({file_info.get('size', 0) // 1024}KB) - Content not displayed directly.]")
-    elif base_content_str is not None:
-        base_content_html_escaped = html.escape(base_content_str)
-    else:
-        base_content_html_escaped = html.escape("[Content not available or error fetching content]")
+# --- HTML Generation Utilities ---
+def dumps_page_json(data):
+    """Serializes a page script payload compactly and without \\uXXXX escapes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=None)
+def relative_link(target_path, start_dir):
+    """os.path.relpath as a '/'-separated link; memoized, as most pages share a few directories."""
+    return os.path.relpath(target_path, start_dir).replace("\\", "/")
+
+
+# Stylesheets of the file and PR pages, written once to the assets directory and linked from every page
+FILE_PAGE_CSS = """body { font-family: 'Inter', sans-serif; margin: 0; padding: 0; background-color: #f0f2f5; color: #1f2937; }
+.navbar { background-color: #374151; padding: 10px 20px; color: white; display: flex; justify-content: space-between; align-items: center; }
+.navbar a { color: white; text-decoration: none; margin-right: 15px; } .navbar .repo-name { font-weight: 600; }
+.container { max-width: 1200px; margin: 20px auto; padding: 20px; background-color: #ffffff; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.05); }
+h1 { color: #111827; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 1em; font-size: 1.8em; }
+select { padding: 10px; margin-bottom: 10px; border-radius: 6px; border: 1px solid #d1d5db; background-color: #f9fafb; width: 100%; max-width: 500px; box-sizing: border-box; }
+#content-display-area { margin-top: 10px; border-radius: 6px; overflow: hidden; }
+pre.text-content-pre { white-space: pre-wrap; word-wrap: break-word; background: #f9fafb; border: 1px solid #e5e7eb; padding: 15px; border-radius: 6px; font-family: 'SFMono-Regular', Consolas, 'Liberation Mono', Menlo, Courier, monospace; font-size: 0.875em; line-height: 1.6; overflow-x: auto;}
+.pr-link-container, .pr-details-link-container { margin-bottom: 20px; font-size: 0.9em; }
+.pr-link-container a, .pr-details-link-container a { color: #2563eb; text-decoration: none; } .pr-link-container a:hover, .pr-details-link-container a:hover { text-decoration: underline; }
+.status-message { padding: 10px; border-radius: 6px; margin-bottom: 15px; background-color: #eff6ff; color: #1e40af; border: 1px solid #bfdbfe; }
+.added-line { background-color: #e6ffed; /* General added line */ }
+.pr-annotated { cursor: help; }
+.pr-annotated:hover { background-color: #c3f7c3; }
+.pr-section-for-file { margin-bottom: 2em; padding-bottom: 1em; border-bottom: 1px solid #ccc; }
+.pr-section-for-file:last-child { border-bottom: none; }
+.pr-section-for-file h3 { font-size: 1.1em; margin-bottom: 0.5em; }
+.diff-view-item { border: 1px solid #e0e0e0; border-radius: 4px; margin-top: 0.5em; }
+"""
 
-    html_file_dir_abs = os.path.dirname(html_file_path_abs)
-    html_output_dir_abs = os.path.abspath(os.path.join(html_file_dir_abs, ".."))
-    index_rel_path = os.path.relpath(os.path.join(html_output_dir_abs, "index.html"), html_file_dir_abs).replace("\\",
-                                                                                                                 "/")
+PR_PAGE_CSS = """body { font-family: 'Inter', sans-serif; margin: 0; padding: 0; background-color: #f0f2f5; color: #1f2937; }
+.navbar { background-color: #374151; padding: 10px 20px; color: white; display: flex; justify-content: space-between; align-items: center; }
+.navbar a { color: white; text-decoration: none; margin-right: 15px; } .navbar .repo-name { font-weight: 600; }
+.container { max-width: 1200px; margin: 20px auto; padding: 20px; background-color: #ffffff; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.05); }
+h1, h2, h3 { color: #111827; }
+h1 { border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 0.5em; font-size: 1.8em; }
+.pr-meta { font-size: 0.9em; color: #4b5563; margin-bottom: 1.5em; } .pr-meta strong { color: #1f2937; } .pr-meta a { color: #2563eb; }
+.pr-body { background-color: #f9fafb; border: 1px solid #e5e7eb; padding: 15px; border-radius: 6px; margin-bottom: 2em; white-space: pre-wrap; word-wrap: break-word; line-height: 1.6; }
+h2 { font-size: 1.5em; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 1em; }
+.file-change-item { margin-bottom: 2em; padding-bottom: 1.5em; border-bottom: 1px dashed #d1d5db; } .file-change-item:last-child { border-bottom: none; }
+.file-change-item h3 { font-size: 1.2em; margin-bottom: 0.5em; } .file-change-item h3 a { color: #111827; }
+.file-status { font-size: 0.8em; color: #6b7280; font-weight: normal; margin-left: 5px; }
+.diff-view { border: 1px solid #e5e7eb; border-radius: 6px; overflow: hidden; margin-top: 0.5em; }
+.d2h-file-header { display: none !important; } .no-patch-message { font-style: italic; color: #6b7280; background-color: #f9fafb; padding: 10px; border-radius: 4px; border: 1px dashed #e5e7eb;}
+"""
 
-    html_template = f"""
+# Page templates for str.format, so the static markup is built once instead of once per page.
+# Literal braces in the CSS/JS are doubled.
+FILE_PAGE_TEMPLATE = """
 <!DOCTYPE html><html lang="en">
 <head>
     <meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{file_path_display} - {owner}/{repo}</title>
     <link rel="stylesheet" type="text/css" href="{assets_rel_path}/diff2html.min.css">
-    <style>
-        body {{ font-family: 'Inter', sans-serif; margin: 0; padding: 0; background-color: #f0f2f5; color: #1f2937; }}
-        .navbar {{ background-color: #374151; padding: 10px 20px; color: white; display: flex; justify-content: space-between; align-items: center; }}
-        .navbar a {{ color: white; text-decoration: none; margin-right: 15px; }} .navbar .repo-name {{ font-weight: 600; }}
-        .container {{ max-width: 1200px; margin: 20px auto; padding: 20px; background-color: #ffffff; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.05); }}
-        h1 {{ color: #111827; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 1em; font-size: 1.8em; }}
-        select {{ padding: 10px; margin-bottom: 10px; border-radius: 6px; border: 1px solid #d1d5db; background-color: #f9fafb; width: 100%; max-width: 500px; box-sizing: border-box; }}
-        #content-display-area {{ margin-top: 10px; border-radius: 6px; overflow: hidden; }}
-        pre.text-content-pre {{ white-space: pre-wrap; word-wrap: break-word; background: #f9fafb; border: 1px solid #e5e7eb; padding: 15px; border-radius: 6px; font-family: 'SFMono-Regular', Consolas, 'Liberation Mono', Menlo, Courier, monospace; font-size: 0.875em; line-height: 1.6; overflow-x: auto;}}
-        .pr-link-container, .pr-details-link-container {{ margin-bottom: 20px; font-size: 0.9em; }}
-        .pr-link-container a, .pr-details-link-container a {{ color: #2563eb; text-decoration: none; }} .pr-link-container a:hover, .pr-details-link-container a:hover {{ text-decoration: underline; }}
-        .status-message {{ padding: 10px; border-radius: 6px; margin-bottom: 15px; background-color: #eff6ff; color: #1e40af; border: 1px solid #bfdbfe; }}
-        .added-line {{ background-color: #e6ffed; /* General added line */ }}
-        .pr-annotated {{ 
-            cursor: help; 
-        }}
-        .pr-annotated:hover {{ background-color: #c3f7c3; }}
-        .pr-section-for-file {{ margin-bottom: 2em; padding-bottom: 1em; border-bottom: 1px solid #ccc; }}
-        .pr-section-for-file:last-child {{ border-bottom: none; }}
-        .pr-section-for-file h3 {{ font-size: 1.1em; margin-bottom: 0.5em; }}
-        .diff-view-item {{ border: 1px solid #e0e0e0; border-radius: 4px; margin-top: 0.5em; }}
-    </style>
+    <link rel="stylesheet" type="text/css" href="{assets_rel_path}/file_page.css">
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
 </head>
 <body>
     <div class="navbar">
         <a href="{index_rel_path}">🏠 Back to Repository Index</a>
-        <span class="repo-name">{html.escape(owner)}/{html.escape(repo)}</span>
+        <span class="repo-name">{owner_esc}/{repo_esc}</span>
     </div>
     <div class="container">
         <h1>{file_path_display}</h1>
@@ -460,15 +661,15 @@ def generate_file_html_page(owner, repo, file_info, base_content_str, is_binary,
         <div id="selected-pr-link-container" class="pr-link-container"></div>
         <div id="pr-details-link-container" class="pr-details-link-container"></div>
         <div id="content-display-area">
-            {'<pre id="text-content-display" class="text-content-pre"></pre>'}
+            <pre id="text-content-display" class="text-content-pre"></pre>
         </div>
     </div>
     <script type="text/javascript" src="{assets_rel_path}/diff2html-ui.min.js"></script>
     <script>
         const baseFileContentHTML = `{base_content_html_escaped}`; 
-        const prDataForFile = {json.dumps(js_pr_data)};
+        const prDataForFile = {js_pr_data_json};
         const allPrsInterleavedLineData = {all_prs_interleaved_lines_json}; 
-        const fileNameForDiff = "{html.escape(file_info['name'])}"; 
+        const fileNameForDiff = "{file_name_esc}"; 
 
         const contentDisplayArea = document.getElementById('content-display-area');
         const textContentDisplayElement = document.getElementById('text-content-display'); 
@@ -533,6 +734,10 @@ def generate_file_html_page(owner, repo, file_info, base_content_str, is_binary,
                         finalHtml += lineObj.text + '\\n'; // lineObj.text is already HTML escaped
                     }}
                 }});
+            }} else if (Object.keys(prDataForFile).length === 0) {{
+                // No PR touches this file, so its interleaved data is left empty: show the base content
+                displayBaseContent();
+                return;
             }} else {{
                 finalHtml = "No changes from relevant PRs to display in interleaved view, or an error occurred generating it.";
             }}
@@ -556,34 +761,8 @@ def generate_file_html_page(owner, repo, file_info, base_content_str, is_binary,
         displayBaseContent(); 
     </script>
 </body></html>"""
-    os.makedirs(os.path.dirname(html_file_path_abs), exist_ok=True)
-    with open(html_file_path_abs, 'w', encoding='utf-8') as f:
-        f.write(html_template)
-
 
-def generate_repo_index_html(owner, repo, repo_files_metadata, pr_list_details, html_output_dir_abs, assets_rel_path,
-                             pulls_dir_rel_path):
-    files_html_list = "<ul>"
-    sorted_files_metadata = sorted(repo_files_metadata,
-                                   key=lambda x: (0 if x['type'] == 'dir' else 1, x['name'].lower()))
-    for f_info in sorted_files_metadata:
-        icon = "&#128193;" if f_info['type'] == 'dir' else "&#128196;"
-        link_target = f_info["html_link"] if f_info['type'] == 'file' else "#"
-        link_class = "file-link" if f_info['type'] == 'file' else "dir-link"
-        link = f'<a href="{link_target}" class="{link_class}">{html.escape(f_info["name"])}</a>'
-        files_html_list += f'<li><span class="icon">{icon}</span> {link} <span class="path-hint">({html.escape(f_info["path"])})</span></li>'
-    files_html_list += "</ul>"
-    prs_html_list = "<ul>"
-    if pr_list_details:
-        for pr_info in pr_list_details:
-            user_login = html.escape(pr_info.get('user', {}).get('login', 'N/A'))
-            pr_title_escaped = html.escape(pr_info["title"])
-            local_pr_page_link = os.path.join(pulls_dir_rel_path, f"{pr_info['number']}.html").replace("\\", "/")
-            prs_html_list += f'<li><a href="{local_pr_page_link}" title="View PR #{pr_info["number"]} details locally">#{pr_info["number"]}: {pr_title_escaped}</a> (by {user_login}) <a href="{pr_info["html_url"]}" target="_blank" class="github-link" title="View on GitHub">(GH)</a></li>'
-    else:
-        prs_html_list = "<p>No open pull requests found or loaded.</p>"
-    prs_html_list += "</ul>"
-    index_html_content = f"""
+INDEX_PAGE_TEMPLATE = """
 <!DOCTYPE html><html lang="en">
 <head>
     <meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -606,106 +785,267 @@ def generate_repo_index_html(owner, repo, repo_files_metadata, pr_list_details,
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
 </head>
 <body>
-    <div class="navbar"><strong>GitHub Local Viewer</strong><span class="repo-name">{html.escape(owner)} / {html.escape(repo)}</span></div>
+    <div class="navbar"><strong>GitHub Local Viewer</strong><span class="repo-name">{owner_esc} / {repo_esc}</span></div>
     <div class="container">
         <h1>Repository Overview</h1>
         <section id="files-section"><h2>Files and Directories</h2>{files_html_list}</section>
         <section id="prs-section"><h2>Open Pull Requests</h2>{prs_html_list}</section>
     </div>
 </body></html>"""
-    with open(os.path.join(html_output_dir_abs, "index.html"), 'w', encoding='utf-8') as f:
-        f.write(index_html_content)
 
-
-def generate_pr_html_page(owner, repo, pr_info, html_pr_page_path_abs, assets_rel_path, files_dir_rel_path):
-    pr_number = pr_info['number'];
-    pr_title_escaped = html.escape(pr_info['title'])
-    pr_author = html.escape(pr_info.get('user', {}).get('login', 'N/A'))
-    pr_body_html = html.escape(pr_info.get('body') or "No description provided.").replace("\r\n", "<br>\n").replace(
-        "\n", "<br>\n")
-    files_changed_html_content = "";
-    file_patches_for_javascript = []
-    if not pr_info.get('files_changed'):
-        files_changed_html_content = "<p>No file change data for this PR.</p>"
-    else:
-        for i, item in enumerate(pr_info['files_changed']):
-            fname_esc = html.escape(item['filename']);
-            patch_ok = 'patch' in item and item['patch'] is not None
-            status_esc = html.escape(item.get('status', 'N/A'))
-            local_file_link = os.path.join(files_dir_rel_path, item['filename'] + ".html").replace("\\", "/")
-            diff_id = f"diff-output-{i}"
-            files_changed_html_content += f"""<div class="file-change-item"><h3><a href="{local_file_link}" title="View base file">{fname_esc}</a> <span class="file-status">({status_esc})</span></h3>"""
-            if patch_ok:
-                files_changed_html_content += f'<div id="{diff_id}" class="diff-view"></div>'
-                file_patches_for_javascript.append({"id_suffix_for_div": i, "patch": item['patch']})
-            else:
-                files_changed_html_content += "<p class='no-patch-message'>No textual patch (e.g., binary, renamed).</p>"
-            files_changed_html_content += "</div>"
-    pr_page_dir_abs = os.path.dirname(html_pr_page_path_abs)
-    html_output_dir_abs = os.path.abspath(os.path.join(pr_page_dir_abs, ".."))
-    index_rel_path = os.path.relpath(os.path.join(html_output_dir_abs, "index.html"), pr_page_dir_abs).replace("\\",
-                                                                                                               "/")
-    html_template = f"""
+# The PR page is written as head, per-file fragments and tail
+PR_PAGE_HEAD_TEMPLATE = """
 <!DOCTYPE html><html lang="en">
 <head>
     <meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>PR #{pr_number}: {pr_title_escaped} - {owner}/{repo}</title>
     <link rel="stylesheet" type="text/css" href="{assets_rel_path}/diff2html.min.css">
-    <style>
-        body {{ font-family: 'Inter', sans-serif; margin: 0; padding: 0; background-color: #f0f2f5; color: #1f2937; }}
-        .navbar {{ background-color: #374151; padding: 10px 20px; color: white; display: flex; justify-content: space-between; align-items: center; }}
-        .navbar a {{ color: white; text-decoration: none; margin-right: 15px; }} .navbar .repo-name {{ font-weight: 600; }}
-        .container {{ max-width: 1200px; margin: 20px auto; padding: 20px; background-color: #ffffff; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.05); }}
-        h1, h2, h3 {{ color: #111827; }}
-        h1 {{ border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 0.5em; font-size: 1.8em; }}
-        .pr-meta {{ font-size: 0.9em; color: #4b5563; margin-bottom: 1.5em; }} .pr-meta strong {{ color: #1f2937; }} .pr-meta a {{ color: #2563eb; }}
-        .pr-body {{ background-color: #f9fafb; border: 1px solid #e5e7eb; padding: 15px; border-radius: 6px; margin-bottom: 2em; white-space: pre-wrap; word-wrap: break-word; line-height: 1.6; }}
-        h2 {{ font-size: 1.5em; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.5em; margin-bottom: 1em; }}
-        .file-change-item {{ margin-bottom: 2em; padding-bottom: 1.5em; border-bottom: 1px dashed #d1d5db; }} .file-change-item:last-child {{ border-bottom: none; }}
-        .file-change-item h3 {{ font-size: 1.2em; margin-bottom: 0.5em; }} .file-change-item h3 a {{ color: #111827; }}
-        .file-status {{ font-size: 0.8em; color: #6b7280; font-weight: normal; margin-left: 5px; }}
-        .diff-view {{ border: 1px solid #e5e7eb; border-radius: 6px; overflow: hidden; margin-top: 0.5em; }}
-        .d2h-file-header {{ display: none !important; }} .no-patch-message {{ font-style: italic; color: #6b7280; background-color: #f9fafb; padding: 10px; border-radius: 4px; border: 1px dashed #e5e7eb;}}
-    </style>
+    <link rel="stylesheet" type="text/css" href="{assets_rel_path}/pr_page.css">
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
 </head>
 <body>
-    <div class="navbar"><a href="{index_rel_path}">🏠 Back to Index</a><span class="repo-name">{html.escape(owner)}/{html.escape(repo)}</span></div>
+    <div class="navbar"><a href="{index_rel_path}">🏠 Back to Index</a><span class="repo-name">{owner_esc}/{repo_esc}</span></div>
     <div class="container">
         <h1>PR #{pr_number}: {pr_title_escaped}</h1>
-        <div class="pr-meta">Opened by <strong>{pr_author}</strong> | <a href="{pr_info['html_url']}" target="_blank" title="View on GitHub">View on GitHub 🔗</a></div>
+        <div class="pr-meta">Opened by <strong>{pr_author}</strong> | <a href="{pr_html_url}" target="_blank" title="View on GitHub">View on GitHub 🔗</a></div>
         <div class="pr-body">{pr_body_html}</div>
-        <h2>Files Changed ({len(pr_info.get('files_changed', []))})</h2>
-        <div id="files-changed-list">{files_changed_html_content}</div>
+        <h2>Files Changed ({files_changed_count})</h2>
+        <div id="files-changed-list">"""
+
+PR_PAGE_TAIL_TEMPLATE = """</div>
     </div>
     <script type="text/javascript" src="{assets_rel_path}/diff2html-ui.min.js"></script>
     <script>
-        const filePatches = {json.dumps(file_patches_for_javascript)};
-        filePatches.forEach(fileData => {{
-            const targetElement = document.getElementById(`diff-output-${{fileData.id_suffix_for_div}}`);
-            if (targetElement && fileData.patch) {{
+        // Each diff container carries its patch in a data-patch attribute (decoded by the browser).
+        // Diffs are drawn a few at a time in idle periods so the page stays responsive for large PRs.
+        const pendingDiffViews = Array.from(document.querySelectorAll('div.diff-view[data-patch]'));
+        const scheduleIdle = window.requestIdleCallback
+            ? callback => window.requestIdleCallback(callback)
+            : callback => setTimeout(() => {{
+                const start = Date.now();
+                callback({{ timeRemaining: () => Math.max(0, 50 - (Date.now() - start)) }});
+            }}, 1);
+        function drawDiffView(targetElement) {{
+            const patch = targetElement.dataset.patch;
+            if (patch) {{
                 const diff2htmlUi = new Diff2HtmlUI(targetElement);
-                diff2htmlUi.draw(fileData.patch, {{ inputFormat: 'diff', showFiles: false, matching: 'lines', outputFormat: 'side-by-side', drawFileList: false }});
+                diff2htmlUi.draw(patch, {{ inputFormat: 'diff', showFiles: false, matching: 'lines', outputFormat: 'side-by-side', drawFileList: false }});
             }}
-        }});
+        }}
+        function drawPendingDiffViews(deadline) {{
+            do {{
+                drawDiffView(pendingDiffViews.shift());
+            }} while (pendingDiffViews.length && deadline.timeRemaining() > 5);
+            if (pendingDiffViews.length) scheduleIdle(drawPendingDiffViews);
+        }}
+        if (pendingDiffViews.length) scheduleIdle(drawPendingDiffViews);
     </script>
 </body></html>"""
-    with open(html_pr_page_path_abs, 'w', encoding='utf-8') as f:
-        f.write(html_template)
 
 
+def write_html_if_changed(html_file_path_abs, html_content):
+    """
+    Writes an HTML page unless the page on disk already has this content, judged by a
+    BLAKE2 digest kept in a '<page>.hash' sidecar file.
+    """
+    content_hash = hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).hexdigest()
+    hash_file_path = html_file_path_abs + '.hash'
+    if os.path.exists(html_file_path_abs):
+        try:
+            with open(hash_file_path, 'r', encoding='utf-8') as f:
+                if f.read() == content_hash:
+                    return
+        except OSError:
+            pass
+    with open(html_file_path_abs, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    with open(hash_file_path, 'w', encoding='utf-8') as f:
+        f.write(content_hash)
+
+
+def download_asset(session, url, file_path_abs):
+    filename = os.path.basename(file_path_abs)
+    print(f"Downloading {filename}...")
+    try:
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        with open(file_path_abs, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+    except Exception as e:
+        print(f"Failed to download {filename}: {e}")
+        return False
+    return True
+
+
+def write_stylesheet_if_changed(css_path_abs, css_content):
+    """Writes a generated stylesheet unless the file on disk already has this content."""
+    try:
+        with open(css_path_abs, 'r', encoding='utf-8') as f:
+            if f.read() == css_content:
+                return
+    except OSError:
+        pass
+    with open(css_path_abs, 'w', encoding='utf-8') as f:
+        f.write(css_content)
+
+
+def ensure_assets(assets_dir_abs):
+    ensure_dir(assets_dir_abs)
+    write_stylesheet_if_changed(os.path.join(assets_dir_abs, "file_page.css"), FILE_PAGE_CSS)
+    write_stylesheet_if_changed(os.path.join(assets_dir_abs, "pr_page.css"), PR_PAGE_CSS)
+    js_filename = "diff2html-ui.min.js";
+    css_filename = "diff2html.min.css"
+    js_path_abs = os.path.join(assets_dir_abs, js_filename);
+    css_path_abs = os.path.join(assets_dir_abs, css_filename)
+    missing_assets = [(url, path) for url, path in ((DIFF2HTML_UI_JS_URL, js_path_abs), (DIFF2HTML_CSS_URL, css_path_abs))
+                      if not os.path.exists(path)]
+    if not missing_assets:
+        return True
+    # Both assets come from the same CDN: download them concurrently over one keep-alive session
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(missing_assets)) as executor:
+        results = list(executor.map(lambda asset: download_asset(session, *asset), missing_assets))
+    return all(results)
+
+
+def generate_file_html_page(owner, repo, file_info, base_content_str, is_binary, is_too_large,
+                            relevant_prs_info, html_file_path_abs, assets_rel_path, pulls_dir_rel_path,
+                            all_prs_interleaved_lines_json, base_content_escaped=None, owner_esc=None, repo_esc=None):
+    file_path_display = html.escape(file_info['path'])
+    pr_options_parts = ['<option value="base_content">Show Base Content</option>',
+                        # Changed option value to match JS, and text for clarity
+                        '<option value="all_pr_changes_interleaved">Show All PR Additions (Interleaved View)</option>']
+
+    js_pr_data = {}
+
+    for pr_num_int, pr_data in relevant_prs_info.items():
+        pr_num_str = str(pr_num_int)
+        pr_title_escaped = html.escape(f"#{pr_num_str}: {pr_data['title']}")
+        pr_options_parts.append(f'<option value="{pr_num_str}">{pr_title_escaped}</option>')
+
+        js_pr_data[pr_num_str] = {
+            "title": pr_data['title'],
+            "patch": pr_data.get('patch_for_this_file'),
+            "html_url": pr_data['html_url'],
+            "merged_content_html": pr_data.get('merged_content_html_for_this_file'),
+            "local_pr_page_link": posixpath.join(pulls_dir_rel_path, f"{pr_num_str}.html")
+        }
+
+    pr_options_html = "".join(pr_options_parts)
+
+    if is_binary:
+        base_content_html_escaped = html.escape(
+            f"[Binary File - Content not displayed. Size: {file_info.get('size', 0)} bytes]")
+    elif is_too_large:
+        base_content_html_escaped = html.escape(
+            f"[File Too Large ({file_info.get('size', 0) // 1024}KB) - Content not displayed directly.]")
+    elif base_content_escaped is not None:
+        base_content_html_escaped = base_content_escaped
+    elif base_content_str is not None:
+        base_content_html_escaped = html.escape(base_content_str)
+    else:
+        base_content_html_escaped = html.escape("[Content not available or error fetching content]")
+
+    html_file_dir_abs = os.path.dirname(html_file_path_abs)
+    html_output_dir_abs = os.path.abspath(os.path.join(html_file_dir_abs, ".."))
+    index_rel_path = relative_link(os.path.join(html_output_dir_abs, "index.html"), html_file_dir_abs)
+
+    html_template = FILE_PAGE_TEMPLATE.format(
+        file_path_display=file_path_display, owner=owner, repo=repo,
+        owner_esc=html.escape(owner) if owner_esc is None else owner_esc,
+        repo_esc=html.escape(repo) if repo_esc is None else repo_esc, assets_rel_path=assets_rel_path, index_rel_path=index_rel_path,
+        pr_options_html=pr_options_html, base_content_html_escaped=base_content_html_escaped,
+        js_pr_data_json=dumps_page_json(js_pr_data),
+        all_prs_interleaved_lines_json=all_prs_interleaved_lines_json, file_name_esc=html.escape(file_info['name']))
+    ensure_dir(os.path.dirname(html_file_path_abs))
+    write_html_if_changed(html_file_path_abs, html_template)
+
+
+def generate_repo_index_html(owner, repo, repo_files_metadata, pr_list_details, html_output_dir_abs, assets_rel_path,
+                             pulls_dir_rel_path):
+    files_html_parts = ["<ul>"]
+    sorted_files_metadata = sorted(repo_files_metadata,
+                                   key=lambda x: (0 if x['type'] == 'dir' else 1, x['name'].lower()))
+    for f_info in sorted_files_metadata:
+        icon = "&#128193;" if f_info['type'] == 'dir' else "&#128196;"
+        link_target = f_info["html_link"] if f_info['type'] == 'file' else "#"
+        link_class = "file-link" if f_info['type'] == 'file' else "dir-link"
+        link = f'<a href="{link_target}" class="{link_class}">{html.escape(f_info["name"])}</a>'
+        files_html_parts.append(
+            f'<li><span class="icon">{icon}</span> {link} <span class="path-hint">({html.escape(f_info["path"])})</span></li>')
+    files_html_parts.append("</ul>")
+    files_html_list = "".join(files_html_parts)
+    prs_html_parts = ["<ul>"]
+    if pr_list_details:
+        for pr_info in pr_list_details:
+            user_login = html.escape(pr_info.get('user', {}).get('login', 'N/A'))
+            pr_title_escaped = html.escape(pr_info["title"])
+            local_pr_page_link = posixpath.join(pulls_dir_rel_path, f"{pr_info['number']}.html")
+            prs_html_parts.append(
+                f'<li><a href="{local_pr_page_link}" title="View PR #{pr_info["number"]} details locally">#{pr_info["number"]}: {pr_title_escaped}</a> (by {user_login}) <a href="{pr_info["html_url"]}" target="_blank" class="github-link" title="View on GitHub">(GH)</a></li>')
+    else:
+        prs_html_parts = ["<p>No open pull requests found or loaded.</p>"]
+    prs_html_parts.append("</ul>")
+    prs_html_list = "".join(prs_html_parts)
+    index_html_content = INDEX_PAGE_TEMPLATE.format(
+        owner=owner, repo=repo, owner_esc=html.escape(owner), repo_esc=html.escape(repo),
+        files_html_list=files_html_list, prs_html_list=prs_html_list)
+    with open(os.path.join(html_output_dir_abs, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(index_html_content)
+
+
+def generate_pr_html_page(owner, repo, pr_info, html_pr_page_path_abs, assets_rel_path, files_dir_rel_path,
+                          owner_esc=None, repo_esc=None):
+    pr_number = pr_info['number'];
+    pr_title_escaped = html.escape(pr_info['title'])
+    pr_author = html.escape(pr_info.get('user', {}).get('login', 'N/A'))
+    pr_body_html = html.escape(pr_info.get('body') or "No description provided.").replace("\r\n", "<br>\n").replace(
+        "\n", "<br>\n")
+    pr_page_dir_abs = os.path.dirname(html_pr_page_path_abs)
+    html_output_dir_abs = os.path.abspath(os.path.join(pr_page_dir_abs, ".."))
+    index_rel_path = relative_link(os.path.join(html_output_dir_abs, "index.html"), pr_page_dir_abs)
+    # Each changed file's fragment is written as it is built, so the whole page is never held in memory
+    with open(html_pr_page_path_abs, 'w', encoding='utf-8') as f:
+        f.write(PR_PAGE_HEAD_TEMPLATE.format(
+            pr_number=pr_number, pr_title_escaped=pr_title_escaped, owner=owner, repo=repo,
+            owner_esc=html.escape(owner) if owner_esc is None else owner_esc,
+            repo_esc=html.escape(repo) if repo_esc is None else repo_esc, assets_rel_path=assets_rel_path,
+            index_rel_path=index_rel_path, pr_author=pr_author, pr_html_url=pr_info['html_url'],
+            pr_body_html=pr_body_html, files_changed_count=len(pr_info.get('files_changed', []))))
+        if not pr_info.get('files_changed'):
+            f.write("<p>No file change data for this PR.</p>")
+        else:
+            for i, item in enumerate(pr_info['files_changed']):
+                fname_esc = html.escape(item['filename']);
+                patch_ok = 'patch' in item and item['patch'] is not None
+                status_esc = html.escape(item.get('status', 'N/A'))
+                local_file_link = posixpath.join(files_dir_rel_path, item['filename'] + ".html")
+                diff_id = f"diff-output-{i}"
+                f.write(f"""<div class="file-change-item"><h3><a href="{local_file_link}" title="View base file">{fname_esc}</a> <span class="file-status">({status_esc})</span></h3>""")
+                if patch_ok:
+                    f.write(f'<div id="{diff_id}" class="diff-view" data-patch="{html.escape(item["patch"])}"></div>')
+                else:
+                    f.write("<p class='no-patch-message'>No textual patch (e.g., binary, renamed).</p>")
+                f.write("</div>")
+        f.write(PR_PAGE_TAIL_TEMPLATE.format(assets_rel_path=assets_rel_path))
+
 # --- New Python function for generating interleaved view data ---
-def generate_interleaved_lines_for_all_prs(base_content_str, relevant_prs_data):  # Removed unused 3rd param
+def generate_interleaved_lines_for_all_prs(base_content_str, relevant_prs_data,
+                                           base_lines_escaped=None):  # Removed unused 3rd param
     """
     Attempts to create a single list of line objects representing the base content
     with additions from all relevant PRs interleaved and annotated.
     This is a best-effort visualization, not a true sequential merge.
     Returns a list of dicts: [{'text': '...', 'type': 'base'/'added', 'pr_info': pr_details_or_None}]
+    base_lines_escaped may pass in html.escape(base_content_str).splitlines() if the caller has it.
     """
     if base_content_str is None: base_content_str = ""
-    base_lines = base_content_str.splitlines()
+    if base_lines_escaped is None:
+        base_lines_escaped = html.escape(base_content_str).splitlines()
 
-    interleaved_lines = [{'text': html.escape(line), 'type': 'base', 'pr_info': None} for line in base_lines]
+    interleaved_lines = [{'text': line, 'type': 'base', 'pr_info': None} for line in base_lines_escaped]
+    # Without any patch there is nothing to parse; the base lines are the whole result
+    if not any(pr_data.get("patch") for pr_data in relevant_prs_data.values()):
+        return interleaved_lines
     additions_map = {}
 
     sorted_pr_numbers = sorted(relevant_prs_data.keys(), key=lambda x: int(x))
@@ -716,59 +1056,140 @@ def generate_interleaved_lines_for_all_prs(base_content_str, relevant_prs_data):
         if not patch_string:
             continue
 
-        pr_details = {
-            'number': pr_num_str,
-            'title': html.escape(pr_data.get('title', 'Unknown PR')),  # Title is already escaped if from user input
-            'html_url': pr_data.get('html_url', '#'),
-            'local_pr_page_link': pr_data.get('local_pr_page_link', '#')  # This is now part of pr_data
-        }
-
-        raw_patch_lines = patch_string.splitlines()
-        current_hunk_header = None
-        current_hunk_body = []
+        # Built on the first added line, so deletion-only patches skip it; all of the PR's lines share it
+        pr_details = None
+
+        # The whole patch is escaped in one call: escaping never touches line breaks or the
+        # '@@'/'+'/'-'/' ' line prefixes, so the lines and hunk headers parse as before.
+        # Hunk headers and body lines are then picked out by one regex scan; lines before the
+        # first hunk and the bodies of hunks whose header does not parse are ignored.
+        in_parsed_hunk = False
+        target_insertion_line_0_idx = temp_base_line_offset_in_hunk = 0
+        for patch_line_match in PATCH_LINE_RE.finditer(html.escape(patch_string)):
+            line_prefix = patch_line_match.group(1)
+            if line_prefix == "@@":
+                match = HUNK_HEADER_RE.match(patch_line_match.group(0))
+                in_parsed_hunk = match is not None
+                if not in_parsed_hunk: continue
+
+                old_start_1based = int(match.group(1))
+                target_insertion_line_0_idx = old_start_1based - 1 if old_start_1based > 0 else -1
+                temp_base_line_offset_in_hunk = 0
+            elif not in_parsed_hunk:
+                continue
+            elif line_prefix == "+":
+                if pr_details is None:
+                    pr_details = {
+                        'number': pr_num_str,
+                        'title': html.escape(pr_data.get('title', 'Unknown PR')),  # Title is already escaped if from user input
+                        'html_url': pr_data.get('html_url', '#'),
+                        'local_pr_page_link': pr_data.get('local_pr_page_link', '#')  # This is now part of pr_data
+                    }
+                line_obj = {'text': patch_line_match.group(2), 'type': 'added', 'pr_info': pr_details}
+                insertion_key = target_insertion_line_0_idx + temp_base_line_offset_in_hunk
+                additions_map.setdefault(insertion_key, []).append(line_obj)
+            else:  # '-' or ' '
+                temp_base_line_offset_in_hunk += 1
+
+    # Additions before the first base line (new files), then the base lines with each insertion
+    # point's additions spliced in after it; runs of base lines are copied as slices, so the work
+    # is per insertion point rather than per base line (points past the end are dropped)
+    final_lines_with_objects = list(additions_map.get(-1, ()))
+    base_line_count = len(interleaved_lines)
+    next_base_line_idx = 0
+    for insertion_idx in sorted(idx for idx in additions_map if 0 <= idx < base_line_count):
+        final_lines_with_objects += interleaved_lines[next_base_line_idx:insertion_idx + 1]
+        final_lines_with_objects += additions_map[insertion_idx]
+        next_base_line_idx = insertion_idx + 1
+    final_lines_with_objects += interleaved_lines[next_base_line_idx:]
 
-        hunk_sections = []
-        for line in raw_patch_lines:
-            if line.startswith("@@"):
-                if current_hunk_header: hunk_sections.append((current_hunk_header, current_hunk_body))
-                current_hunk_header = line;
-                current_hunk_body = []
-            elif current_hunk_header:
-                if line.startswith(("+", "-", " ", "\\")): current_hunk_body.append(line)
-        if current_hunk_header: hunk_sections.append((current_hunk_header, current_hunk_body))
+    return final_lines_with_objects
 
-        for header, body in hunk_sections:
-            match = re.search(r"@@ -(\d+)(,(\d+))? \+(\d+)(,(\d+))? @@", header)
-            if not match: continue
 
-            old_start_1based = int(match.group(1))
-            target_insertion_line_0_idx = old_start_1based - 1 if old_start_1based > 0 else -1
-            temp_base_line_offset_in_hunk = 0
-            for hunk_line in body:
-                if hunk_line.startswith("+"):
-                    line_content = html.escape(hunk_line[1:])
-                    line_obj = {'text': line_content, 'type': 'added', 'pr_info': pr_details}
-                    insertion_key = target_insertion_line_0_idx + temp_base_line_offset_in_hunk
-                    if insertion_key not in additions_map:
-                        additions_map[insertion_key] = []
-                    additions_map[insertion_key].append(line_obj)
-                elif hunk_line.startswith("-"):
-                    temp_base_line_offset_in_hunk += 1
-                elif hunk_line.startswith(" "):
-                    temp_base_line_offset_in_hunk += 1
-
-    final_lines_with_objects = []
-    if -1 in additions_map:
-        for added_line_obj in additions_map[-1]:
-            final_lines_with_objects.append(added_line_obj)
-
-    for i, base_line_text in enumerate(base_lines):
-        final_lines_with_objects.append({'text': html.escape(base_line_text), 'type': 'base', 'pr_info': None})
-        if i in additions_map:
-            for added_line_obj in additions_map[i]:
-                final_lines_with_objects.append(added_line_obj)
+def render_file_page(work_item):
+    """
+    Renders the HTML page of one repository file (its patched view per PR and the interleaved view).
+    Top-level so it can run in a worker process; work_item is a tuple built in process_repository.
+    """
+    (owner, repo, owner_esc, repo_esc, file_full_path, file_content_detail, file_pr_changes,
+     html_files_sub_dir_abs, assets_dir_abs, html_pulls_sub_dir_abs) = work_item
+    output_html_file_abs_path = os.path.join(html_files_sub_dir_abs, file_full_path + ".html")
+    output_html_file_dir_abs = os.path.dirname(output_html_file_abs_path)
+    assets_rel_path_for_file_page = relative_link(assets_dir_abs, output_html_file_dir_abs)
+    pulls_dir_rel_path_for_file_page = relative_link(html_pulls_sub_dir_abs, output_html_file_dir_abs)
+
+    relevant_prs_info_for_file = {}
+    all_prs_patches_for_interleaved_view = {}
+    # Escaped once per file and shared by the page body, every PR's patched view and the
+    # interleaved view; the line list is built on first use (binary files never need it)
+    base_content_escaped = None
+    base_lines_escaped = None
+    if file_content_detail['content_str'] is not None:
+        base_content_escaped = html.escape(file_content_detail['content_str'])
+
+    for pr_num, pr_title, pr_html_url, pr_patch in file_pr_changes:
+        merged_content_html = None
+        pr_annotation_details = {
+            'number': pr_num,
+            'title': pr_title,
+            'gh_link': pr_html_url,
+            'local_link': posixpath.join(pulls_dir_rel_path_for_file_page, f"{pr_num}.html")
+        }
+        if not file_content_detail['is_binary'] and file_content_detail['content_str'] is not None and \
+                pr_patch is not None:
+            try:
+                if base_lines_escaped is None:
+                    base_lines_escaped = base_content_escaped.splitlines()
+                merged_content_html = apply_patch_to_content(
+                    file_content_detail['content_str'],
+                    pr_patch,
+                    pr_annotation_details,
+                    base_lines_escaped=base_lines_escaped
+                )
+            except Exception as e:
+                print(f"Error applying single patch for PR #{pr_num} to file {file_full_path}: {e}")
+                merged_content_html = html.escape(f"[Error applying patch: {e}]")
+
+        relevant_prs_info_for_file[pr_num] = {
+            'title': pr_title,
+            'html_url': pr_html_url,
+            'patch_for_this_file': pr_patch,
+            'merged_content_html_for_this_file': merged_content_html
+        }
+        all_prs_patches_for_interleaved_view[str(pr_num)] = {
+            "patch": pr_patch,
+            "title": pr_title,
+            "html_url": pr_html_url,
+            "local_pr_page_link": posixpath.join(pulls_dir_rel_path_for_file_page, f"{pr_num}.html")
+        }
 
-    return final_lines_with_objects
+    # Files no PR touches (most of them) skip the interleaved view's data; the page script shows
+    # their base content instead
+    interleaved_lines_data = []
+    if file_pr_changes and not file_content_detail['is_binary'] and file_content_detail['content_str'] is not None:
+        try:
+            if base_lines_escaped is None:
+                base_lines_escaped = base_content_escaped.splitlines()
+            interleaved_lines_data = generate_interleaved_lines_for_all_prs(
+                file_content_detail['content_str'],
+                all_prs_patches_for_interleaved_view,
+                base_lines_escaped=base_lines_escaped
+            )
+        except Exception as e:
+            print(f"Error generating interleaved view for {file_full_path}: {e}")
+            interleaved_lines_data = [
+                {'text': html.escape(f"[Error generating interleaved view: {e}]"), 'type': 'base', 'pr_info': None}]
+
+    file_info_for_page_template = {'path': file_full_path, 'name': file_content_detail['name'],
+                                   'size': file_content_detail['size']}
+    generate_file_html_page(
+        owner, repo, file_info_for_page_template,
+        file_content_detail['content_str'], file_content_detail['is_binary'], file_content_detail['is_too_large'],
+        relevant_prs_info_for_file, output_html_file_abs_path,
+        assets_rel_path_for_file_page, pulls_dir_rel_path_for_file_page,
+        dumps_page_json(interleaved_lines_data) if interleaved_lines_data else "[]",
+        base_content_escaped=base_content_escaped, owner_esc=owner_esc, repo_esc=repo_esc
+    )
 
 
 # --- Main Processing Logic ---
@@ -780,9 +1201,9 @@ def process_repository(owner, repo):
     html_files_sub_dir_abs = os.path.join(html_output_dir_abs, "files")
     html_pulls_sub_dir_abs = os.path.join(html_output_dir_abs, "pulls")
     assets_dir_abs = os.path.join(html_output_dir_abs, "assets")
-    os.makedirs(html_files_sub_dir_abs, exist_ok=True)
-    os.makedirs(html_pulls_sub_dir_abs, exist_ok=True)
-    os.makedirs(assets_dir_abs, exist_ok=True)
+    ensure_dir(html_files_sub_dir_abs)
+    ensure_dir(html_pulls_sub_dir_abs)
+    ensure_dir(assets_dir_abs)
     if not ensure_assets(assets_dir_abs): print("Error: Assets download failed. Aborting."); return
     api = GitHubAPI(owner, repo)
 
@@ -790,30 +1211,49 @@ def process_repository(owner, repo):
     all_repo_files_metadata_for_index = []
     all_files_content_details_for_pages = {}
 
+    # The directory listings are fetched up front (concurrently per tree level); the walk below
+    # keeps the depth-first order of the index
+    repo_dir_listings = api.get_repo_contents_tree()
+    decoded_blobs_by_sha = {}
+
     def fetch_all_repository_items(current_dir_path=''):
-        items_in_dir = api.get_repo_contents(current_dir_path)
+        items_in_dir = repo_dir_listings.get(current_dir_path)
         if not items_in_dir: return
         for item in items_in_dir:
             item_full_path = item['path']
             if item['type'] == 'file':
-                file_html_page_link_rel = os.path.join("files", item_full_path + ".html").replace("\\", "/")
-                all_repo_files_metadata_for_index.append(
-                    {'name': item['name'], 'path': item_full_path, 'type': 'file', 'sha': item['sha'],
-                     'size': item.get('size', 0), 'html_link': file_html_page_link_rel})
-                if item_full_path not in all_files_content_details_for_pages:
+                file_html_page_link_rel = posixpath.join("files", item_full_path + ".html")
+                # Listings without a 'size' use the cached blob's size on disk (no blob read needed)
+                file_size = item.get('size')
+                if file_size is None:
+                    file_size = api.get_file_blob_size(item['sha'])
+                # Identical blobs (vendored copies, LICENSE files) are read and decoded once per run
+                if item['sha'] not in decoded_blobs_by_sha:
                     file_content_bytes = api.get_file_blob_content(item['sha'])
                     content_str, is_binary = None, True
-                    is_too_large = item.get('size', 0) > MAX_FILE_SIZE_FOR_CONTENT_DISPLAY
                     if file_content_bytes:
-                        try:
-                            content_str, is_binary = file_content_bytes.decode('utf-8'), False
-                        except UnicodeDecodeError:
+                        # Binary files are sniffed by their leading bytes; text that is not valid UTF-8
+                        # is shown with replacement characters
+                        if b'\x00' in file_content_bytes[:BINARY_SNIFF_BYTES]:
                             content_str = f"[Binary content of size {len(file_content_bytes)} bytes]"
+                        else:
+                            content_str, is_binary = str(file_content_bytes, 'utf-8', 'replace'), False
+                    decoded_blobs_by_sha[item['sha']] = (content_str, is_binary,
+                                                         len(file_content_bytes) if file_content_bytes else 0)
+                content_str, is_binary, blob_size = decoded_blobs_by_sha[item['sha']]
+                # A blob that was not cached yet has just been fetched; its length is the size
+                if file_size is None:
+                    file_size = blob_size
+                all_repo_files_metadata_for_index.append(
+                    {'name': item['name'], 'path': item_full_path, 'type': 'file', 'sha': item['sha'],
+                     'size': file_size, 'html_link': file_html_page_link_rel})
+                if item_full_path not in all_files_content_details_for_pages:
+                    is_too_large = file_size > MAX_FILE_SIZE_FOR_CONTENT_DISPLAY
                     all_files_content_details_for_pages[item_full_path] = {'content_str': content_str,
                                                                            'is_binary': is_binary,
                                                                            'is_too_large': is_too_large,
                                                                            'sha': item['sha'],
-                                                                           'size': item.get('size', 0),
+                                                                           'size': file_size,
                                                                            'name': item['name']}
             elif item['type'] == 'dir':
                 all_repo_files_metadata_for_index.append(
@@ -827,9 +1267,10 @@ def process_repository(owner, repo):
     all_pr_details_with_files = {}
     if pull_requests_metadata_list:
         print(f"  Found {len(pull_requests_metadata_list)} open PRs. Fetching file details for each...")
+        pr_files_by_number = api.get_pull_request_files_bulk([pr_meta['number'] for pr_meta in pull_requests_metadata_list])
         for pr_meta in pull_requests_metadata_list:
             pr_number = pr_meta['number']
-            pr_files_changed_data = api.get_pull_request_files(pr_number)
+            pr_files_changed_data = pr_files_by_number[pr_number]
             all_pr_details_with_files[pr_number] = {'number': pr_number, 'title': pr_meta['title'],
                                                     'html_url': pr_meta['html_url'], 'user': pr_meta.get('user'),
                                                     'body': pr_meta.get('body'),
@@ -838,91 +1279,45 @@ def process_repository(owner, repo):
         print("  No open pull requests found or an error occurred.")
 
     print("\nStep 3: Generating repository index.html...")
-    assets_rel_path_for_index = os.path.relpath(assets_dir_abs, html_output_dir_abs).replace("\\", "/")
-    pulls_dir_rel_path_for_index = os.path.relpath(html_pulls_sub_dir_abs, html_output_dir_abs).replace("\\", "/")
+    assets_rel_path_for_index = relative_link(assets_dir_abs, html_output_dir_abs)
+    pulls_dir_rel_path_for_index = relative_link(html_pulls_sub_dir_abs, html_output_dir_abs)
     generate_repo_index_html(owner, repo, all_repo_files_metadata_for_index, list(all_pr_details_with_files.values()),
                              html_output_dir_abs, assets_rel_path_for_index, pulls_dir_rel_path_for_index)
 
     print("\nStep 4: Generating HTML pages for individual files...")
+    # The owner and repo names appear in every page's navbar; they are escaped once here
+    owner_esc, repo_esc = html.escape(owner), html.escape(repo)
+    # Index the PR changes by filename once (in PR order, first patched change per PR) instead of
+    # scanning every PR's file list for each repository file
+    pr_changes_by_filename = {}
+    for pr_num, pr_detail_data in all_pr_details_with_files.items():
+        seen_filenames = set()
+        for pr_file_change_info in pr_detail_data.get('files_changed', []):
+            filename = pr_file_change_info['filename']
+            if 'patch' in pr_file_change_info and filename not in seen_filenames:
+                seen_filenames.add(filename)
+                pr_changes_by_filename.setdefault(filename, []).append(
+                    (pr_num, pr_detail_data['title'], pr_detail_data['html_url'], pr_file_change_info['patch']))
+    # Pages are independent and CPU-bound, so they are rendered in worker processes; each work
+    # item carries only the file's own details and the PR changes that touch it
+    file_page_work_items = []
     for file_full_path, file_content_detail in all_files_content_details_for_pages.items():
-        output_html_file_abs_path = os.path.join(html_files_sub_dir_abs, file_full_path + ".html")
-        output_html_file_dir_abs = os.path.dirname(output_html_file_abs_path)
-        assets_rel_path_for_file_page = os.path.relpath(assets_dir_abs, output_html_file_dir_abs).replace("\\", "/")
-        pulls_dir_rel_path_for_file_page = os.path.relpath(html_pulls_sub_dir_abs, output_html_file_dir_abs).replace(
-            "\\", "/")
-
-        relevant_prs_info_for_file = {}
-        all_prs_patches_for_interleaved_view = {}
-
-        for pr_num, pr_detail_data in all_pr_details_with_files.items():
-            for pr_file_change_info in pr_detail_data.get('files_changed', []):
-                if pr_file_change_info['filename'] == file_full_path and 'patch' in pr_file_change_info:
-                    merged_content_html = None
-                    pr_annotation_details = {
-                        'number': pr_num,
-                        'title': pr_detail_data['title'],
-                        'gh_link': pr_detail_data['html_url'],
-                        'local_link': os.path.join(pulls_dir_rel_path_for_file_page, f"{pr_num}.html").replace("\\",
-                                                                                                               "/")
-                    }
-                    if not file_content_detail['is_binary'] and file_content_detail['content_str'] is not None and \
-                            pr_file_change_info['patch'] is not None:
-                        try:
-                            merged_content_html = apply_patch_to_content(
-                                file_content_detail['content_str'],
-                                pr_file_change_info['patch'],
-                                pr_annotation_details
-                            )
-                        except Exception as e:
-                            print(f"Error applying single patch for PR #{pr_num} to file {file_full_path}: {e}")
-                            merged_content_html = html.escape(f"[Error applying patch: {e}]")
-
-                    relevant_prs_info_for_file[pr_num] = {
-                        'title': pr_detail_data['title'],
-                        'html_url': pr_detail_data['html_url'],
-                        'patch_for_this_file': pr_file_change_info['patch'],
-                        'merged_content_html_for_this_file': merged_content_html
-                    }
-                    all_prs_patches_for_interleaved_view[str(pr_num)] = {
-                        "patch": pr_file_change_info['patch'],
-                        "title": pr_detail_data['title'],
-                        "html_url": pr_detail_data['html_url'],
-                        "local_pr_page_link": os.path.join(pulls_dir_rel_path_for_file_page, f"{pr_num}.html").replace(
-                            "\\", "/")
-                    }
-                    break
-
-        interleaved_lines_data = []
-        if not file_content_detail['is_binary'] and file_content_detail['content_str'] is not None:
-            try:
-                interleaved_lines_data = generate_interleaved_lines_for_all_prs(
-                    file_content_detail['content_str'],
-                    all_prs_patches_for_interleaved_view
-                )
-            except Exception as e:
-                print(f"Error generating interleaved view for {file_full_path}: {e}")
-                interleaved_lines_data = [
-                    {'text': html.escape(f"[Error generating interleaved view: {e}]"), 'type': 'base', 'pr_info': None}]
-
-        file_info_for_page_template = {'path': file_full_path, 'name': file_content_detail['name'],
-                                       'size': file_content_detail['size']}
-        generate_file_html_page(
-            owner, repo, file_info_for_page_template,
-            file_content_detail['content_str'], file_content_detail['is_binary'], file_content_detail['is_too_large'],
-            relevant_prs_info_for_file, output_html_file_abs_path,
-            assets_rel_path_for_file_page, pulls_dir_rel_path_for_file_page,
-            json.dumps(interleaved_lines_data)
-        )
+        file_pr_changes = pr_changes_by_filename.get(file_full_path, [])
+        file_page_work_items.append((owner, repo, owner_esc, repo_esc, file_full_path, file_content_detail, file_pr_changes,
+                                     html_files_sub_dir_abs, assets_dir_abs, html_pulls_sub_dir_abs))
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(render_file_page, file_page_work_items, chunksize=16))
 
     print("\nStep 5: Generating HTML pages for Pull Requests...")
     if all_pr_details_with_files:
         for pr_number_key, pr_detail_data_complete in all_pr_details_with_files.items():
             html_pr_page_abs_path = os.path.join(html_pulls_sub_dir_abs, f"{pr_number_key}.html")
             pr_page_dir_abs = os.path.dirname(html_pr_page_abs_path)
-            assets_rel_path_for_pr_page = os.path.relpath(assets_dir_abs, pr_page_dir_abs).replace("\\", "/")
-            files_dir_rel_path_for_pr_page = os.path.relpath(html_files_sub_dir_abs, pr_page_dir_abs).replace("\\", "/")
+            assets_rel_path_for_pr_page = relative_link(assets_dir_abs, pr_page_dir_abs)
+            files_dir_rel_path_for_pr_page = relative_link(html_files_sub_dir_abs, pr_page_dir_abs)
             generate_pr_html_page(owner, repo, pr_detail_data_complete, html_pr_page_abs_path,
-                                  assets_rel_path_for_pr_page, files_dir_rel_path_for_pr_page)
+                                  assets_rel_path_for_pr_page, files_dir_rel_path_for_pr_page,
+                                  owner_esc=owner_esc, repo_esc=repo_esc)
     else:
         print("  No Pull Requests to generate pages for.")
 